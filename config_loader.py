@@ -0,0 +1,40 @@
+import os
+import types
+from functools import lru_cache
+from typing import Mapping
+
+import yaml
+
+# libyaml's C parser when PyYAML was built with it; same safe semantics either way
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+DEFAULT_CONFIG_PATH = 'config.yaml'
+
+
+def _load_compiled(path: str):
+    """Return config_compiled.CONFIG if it was generated from the current config.yaml, else None."""
+    if path != DEFAULT_CONFIG_PATH:
+        return None
+    try:
+        import config_compiled
+    except ImportError:
+        return None
+    # Built by tools/compile_config.py; stale once config.yaml is edited
+    if config_compiled.SOURCE_MTIME_NS != os.stat(path).st_mtime_ns:
+        return None
+    return config_compiled.CONFIG
+
+
+@lru_cache(maxsize=None)
+def load(path: str = DEFAULT_CONFIG_PATH) -> Mapping:
+    """
+    Parse a config file once per process and return a read-only view of it.
+
+    Every caller shares the same parsed data, so callers that need to change
+    it should work on copy.deepcopy(dict(load(...))).
+    """
+    config = _load_compiled(path)
+    if config is None:
+        with open(path, 'rb') as f:
+            config = yaml.load(f, Loader=YAML_LOADER)
+    return types.MappingProxyType(config)
@@ -39,6 +39,10 @@ if [ ! -f ".env" ]; then
     exit 1
 fi
 
+# Precompile config.yaml for the test scripts
+echo "⚙️  Compiling config.yaml..."
+python tools/compile_config.py
+
 # Test the setup
 echo "🧪 Testing the setup..."
 python test_light_mode.py
@@ -0,0 +1,89 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'MindCoDigestBot/1.0 (+https://github.com/aryanj916/bio_digest)'
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'bio_digest')
+
+
+def create_session(pool_connections: int = 4, pool_maxsize: int = 16) -> requests.Session:
+    """Create a pooled HTTPS session that retries transient API failures."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(['HEAD', 'GET'])
+        )
+    )
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def loads_json(content: bytes) -> Any:
+    """Decode a JSON response body, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class SessionMixin:
+    """Connection reuse and conditional GETs shared by the HTTP fetchers."""
+
+    def _init_session(self):
+        self.session = create_session()
+        # Final URL -> (validator headers, response) so repeat GETs can be answered by a 304
+        self._validators: Dict[str, Tuple[Dict[str, str], requests.Response]] = {}
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """GET through the pooled session, sending If-None-Match/If-Modified-Since when we can."""
+        key = requests.Request('GET', url, params=kwargs.get('params')).prepare().url
+        headers = dict(kwargs.pop('headers', None) or {})
+
+        cached = self._validators.get(key)
+        if cached:
+            headers.update(cached[0])
+
+        response = self.session.get(url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and cached:
+            logger.debug(f"Not modified, reusing cached response for {key}")
+            return cached[1]
+
+        if response.ok:
+            validators = {}
+            if response.headers.get('ETag'):
+                validators['If-None-Match'] = response.headers['ETag']
+            if response.headers.get('Last-Modified'):
+                validators['If-Modified-Since'] = response.headers['Last-Modified']
+            if validators:
+                self._validators[key] = (validators, response)
+
+        return response
+
+    def close(self):
+        """Release pooled connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,29 @@
+from dataclasses import dataclass, field, fields
+from typing import Dict, List, Optional
+
+
+@dataclass(slots=True)
+class Paper:
+    """Compact record for a fetched preprint; converted to a dict at the fetcher boundary."""
+    biorxiv_id: str = ''
+    doi: str = ''
+    title: str = ''
+    abstract: str = ''
+    authors: List[str] = field(default_factory=list)
+    categories: List[str] = field(default_factory=list)
+    primary_category: str = ''
+    published: Optional[str] = None
+    updated: Optional[str] = None
+    pdf_link: str = ''
+    arxiv_link: str = ''
+    biorxiv_link: str = ''
+    comments: str = ''
+    version: int = 1
+    source: str = ''
+
+    def to_dict(self) -> Dict:
+        """Shallow dict in the shape the rest of the pipeline expects."""
+        return {name: getattr(self, name) for name in _PAPER_FIELDS}
+
+
+_PAPER_FIELDS = tuple(f.name for f in fields(Paper))
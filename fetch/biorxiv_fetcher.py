@@ -1,14 +1,32 @@
 import requests
 import logging
+import functools
 from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 
+from ._http import SessionMixin, loads_json
+from ._models import Paper
+
 logger = logging.getLogger(__name__)
 
-class BioRxivFetcher:
+
+@functools.lru_cache(maxsize=4096)
+def _parse_ymd(date_str: str) -> datetime:
+    """Parse YYYY-MM-DD by slicing; dates repeat heavily within one dump."""
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+        return datetime(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]), tzinfo=timezone.utc)
+    return datetime.strptime(date_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+
+
+class BioRxivFetcher(SessionMixin):
     """Fetches papers from bioRxiv and medRxiv using their public API."""
     
     BASE_URL = "https://api.biorxiv.org/details"
+    PAGE_SIZE = 100
+    
+    # Stay polite when fanning out cursor pages
+    MAX_PAGE_WORKERS = 6
     
     def __init__(self, categories: List[str], days_lookback: int = 1):
         """
@@ -20,39 +38,49 @@ class BioRxivFetcher:
         """
         self.categories = categories  # 'biorxiv', 'medrxiv', or both
         self.days_lookback = days_lookback
+        self._init_session()
     
     def fetch(self) -> List[Dict]:
         """Fetch papers from bioRxiv and/or medRxiv."""
-        all_papers = []
-        seen_ids = set()
-        
         # Get date range
         end_date = datetime.now(timezone.utc)
         start_date = end_date - timedelta(days=self.days_lookback)
         
-        for category in self.categories:
-            logger.info(f"Fetching papers from {category}")
-            
-            try:
-                papers = self._fetch_category(category, start_date, end_date)
-                
-                # Deduplicate
-                for paper in papers:
-                    paper_id = paper.get('biorxiv_id') or paper.get('doi', '')
-                    if paper_id and paper_id not in seen_ids:
-                        seen_ids.add(paper_id)
-                        all_papers.append(paper)
-                
-                logger.info(f"Fetched {len(papers)} papers from {category}")
-                
-            except Exception as e:
-                logger.error(f"Error fetching from {category}: {e}")
-                continue
+        if not self.categories:
+            return []
+        
+        # Each repository is an independent cursor walk; fetch them concurrently
+        with ThreadPoolExecutor(max_workers=min(8, len(self.categories))) as executor:
+            futures = [
+                executor.submit(self._fetch_category_safe, category, start_date, end_date)
+                for category in self.categories
+            ]
+        
+        # Deduplicate, keeping the first occurrence of each ID
+        merged: Dict[str, Paper] = {}
+        for future in futures:
+            for paper in future.result():
+                paper_id = paper.biorxiv_id or paper.doi
+                if paper_id:
+                    merged.setdefault(paper_id, paper)
+        all_papers = [paper.to_dict() for paper in merged.values()]
         
         logger.info(f"Total unique papers from bioRxiv/medRxiv: {len(all_papers)}")
         return all_papers
     
-    def _fetch_category(self, category: str, start_date: datetime, end_date: datetime) -> List[Dict]:
+    def _fetch_category_safe(self, category: str, start_date: datetime, end_date: datetime) -> List[Paper]:
+        """Fetch a category, logging and swallowing errors so other categories proceed."""
+        logger.info(f"Fetching papers from {category}")
+        
+        try:
+            papers = self._fetch_category(category, start_date, end_date)
+            logger.info(f"Fetched {len(papers)} papers from {category}")
+            return papers
+        except Exception as e:
+            logger.error(f"Error fetching from {category}: {e}")
+            return []
+    
+    def _fetch_category(self, category: str, start_date: datetime, end_date: datetime) -> List[Paper]:
         """Fetch papers from a specific category (biorxiv or medrxiv)."""
         papers = []
         
@@ -60,48 +88,86 @@ class BioRxivFetcher:
         start_str = start_date.strftime('%Y-%m-%d')
         end_str = end_date.strftime('%Y-%m-%d')
         
-        # Build URL: https://api.biorxiv.org/details/[server]/[start_date]/[end_date]/[cursor]
-        cursor = 0
+        # The first page tells us the total, so the remaining cursors can be fetched in parallel
+        data = self._fetch_page(category, start_str, end_str, 0)
+        collection = data.get('collection') if data else None
+        if not collection:
+            logger.debug(f"No results for {category}")
+            return papers
+        papers.extend(self._parse_collection(collection, category))
         
-        while True:
-            url = f"{self.BASE_URL}/{category}/{start_str}/{end_str}/{cursor}"
-            
-            try:
-                logger.debug(f"Fetching from: {url}")
-                response = requests.get(url, timeout=30)
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                # Check if we got results
-                if 'collection' not in data or not data['collection']:
+        # bioRxiv API returns up to 100 results per request
+        # If we got less than 100, we're done
+        if len(collection) < self.PAGE_SIZE:
+            return papers
+        
+        total = self._total_count(data)
+        if total is None:
+            # No advertised total; walk cursors one page at a time
+            cursor = len(collection)
+            while True:
+                data = self._fetch_page(category, start_str, end_str, cursor)
+                collection = data.get('collection') if data else None
+                if not collection:
                     logger.debug(f"No more results for {category} at cursor {cursor}")
                     break
-                
-                # Parse papers
-                for item in data['collection']:
-                    paper = self._parse_paper(item, category)
-                    if paper:
-                        papers.append(paper)
-                
-                # Check if there are more results
-                # bioRxiv API returns up to 100 results per request
-                # If we got less than 100, we're done
-                if len(data['collection']) < 100:
+                papers.extend(self._parse_collection(collection, category))
+                if len(collection) < self.PAGE_SIZE:
+                    break
+                cursor += len(collection)
+            return papers
+        
+        cursors = list(range(self.PAGE_SIZE, total, self.PAGE_SIZE))
+        if not cursors:
+            return papers
+        
+        with ThreadPoolExecutor(max_workers=min(self.MAX_PAGE_WORKERS, len(cursors))) as executor:
+            pages = executor.map(lambda c: self._fetch_page(category, start_str, end_str, c), cursors)
+            # Parse in cursor order so output matches the sequential walk
+            for cursor, data in zip(cursors, pages):
+                collection = data.get('collection') if data else None
+                if not collection:
+                    logger.debug(f"No more results for {category} at cursor {cursor}")
                     break
-                
-                cursor += len(data['collection'])
-                
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Request error for {category}: {e}")
-                break
-            except Exception as e:
-                logger.error(f"Error parsing {category} response: {e}")
-                break
+                papers.extend(self._parse_collection(collection, category))
         
         return papers
     
-    def _parse_paper(self, item: Dict, source: str) -> Optional[Dict]:
+    def _fetch_page(self, category: str, start_str: str, end_str: str, cursor: int) -> Optional[Dict]:
+        """Fetch one cursor page; returns None on failure."""
+        # Build URL: https://api.biorxiv.org/details/[server]/[start_date]/[end_date]/[cursor]
+        url = f"{self.BASE_URL}/{category}/{start_str}/{end_str}/{cursor}"
+        
+        try:
+            logger.debug(f"Fetching from: {url}")
+            response = self._get(url, timeout=30)
+            response.raise_for_status()
+            return loads_json(response.content)
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request error for {category}: {e}")
+        except Exception as e:
+            logger.error(f"Error parsing {category} response: {e}")
+        return None
+    
+    def _parse_collection(self, collection: List[Dict], category: str) -> List[Paper]:
+        """Parse one page of results, skipping malformed items."""
+        papers = []
+        for item in collection:
+            paper = self._parse_paper(item, category)
+            if paper:
+                papers.append(paper)
+        return papers
+    
+    @staticmethod
+    def _total_count(data: Dict) -> Optional[int]:
+        """Read the advertised total result count from a page's messages block."""
+        try:
+            return int(data['messages'][0]['total'])
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+    
+    def _parse_paper(self, item: Dict, source: str) -> Optional[Paper]:
         """Parse a bioRxiv/medRxiv paper into our standard format."""
         try:
             # Extract DOI (unique identifier)
@@ -112,9 +178,10 @@ class BioRxivFetcher:
             # Create bioRxiv ID (remove version from DOI)
             biorxiv_id = doi.split('v')[0] if 'v' in doi else doi
             
-            # Parse dates
+            # Parse dates (bioRxiv only gives one date, used for both fields)
             published_str = item.get('date', '')
             published = self._parse_date(published_str)
+            published_iso = published.isoformat() if published else None
             
             # Get version
             version = item.get('version', '1')
@@ -137,23 +204,23 @@ class BioRxivFetcher:
             
             pdf_link = f"{arxiv_link}.full.pdf"
             
-            return {
-                'biorxiv_id': biorxiv_id,
-                'doi': doi,
-                'title': item.get('title', '').strip(),
-                'abstract': item.get('abstract', '').strip(),
-                'authors': authors,
-                'categories': [category],
-                'primary_category': f"{source}/{category}",
-                'published': published.isoformat() if published else None,
-                'updated': published.isoformat() if published else None,
-                'pdf_link': pdf_link,
-                'arxiv_link': arxiv_link,
-                'biorxiv_link': arxiv_link,
-                'comments': '',
-                'version': version,
-                'source': source
-            }
+            return Paper(
+                biorxiv_id=biorxiv_id,
+                doi=doi,
+                title=item.get('title', '').strip(),
+                abstract=item.get('abstract', '').strip(),
+                authors=authors,
+                categories=[category],
+                primary_category=f"{source}/{category}",
+                published=published_iso,
+                updated=published_iso,
+                pdf_link=pdf_link,
+                arxiv_link=arxiv_link,
+                biorxiv_link=arxiv_link,
+                comments='',
+                version=version,
+                source=source
+            )
             
         except Exception as e:
             logger.error(f"Error parsing paper: {e}")
@@ -166,7 +233,7 @@ class BioRxivFetcher:
         
         try:
             # bioRxiv dates are in format YYYY-MM-DD
-            return datetime.strptime(date_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+            return _parse_ymd(date_str)
         except Exception as e:
             logger.warning(f"Error parsing date '{date_str}': {e}")
             return None
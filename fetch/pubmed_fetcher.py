@@ -1,165 +1,244 @@
 import requests
 import logging
+import functools
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional
-import xml.etree.ElementTree as ET
-from urllib.parse import urlencode
+from io import BytesIO
+from lxml import etree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+from limiters import RateLimiter
+from ._http import SessionMixin, loads_json
 
 logger = logging.getLogger(__name__)
 
-class PubMedFetcher:
+
+@functools.lru_cache(maxsize=4096)
+def _ymd_to_datetime(year_text: Optional[str], month_text: Optional[str], day_text: Optional[str]) -> Optional[datetime]:
+    """Build a UTC datetime from PubMed Year/Month/Day text, memoized on the raw strings."""
+    year = int(year_text) if year_text else None
+    month = int(month_text) if month_text and month_text.isdigit() else 1
+    day = int(day_text) if day_text else 1
+    
+    if year:
+        return datetime(year, month, day, tzinfo=timezone.utc)
+    return None
+
+
+@dataclass(frozen=True)
+class PubMedHandle:
+    """Server-side esearch result set stored on the NCBI history server."""
+    webenv: str
+    query_key: str
+    count: int
+
+
+class PubMedFetcher(SessionMixin):
     """Fetches papers from PubMed using NCBI E-utilities API."""
     
     BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
     
+    # NCBI allows 10 requests/second with an API key and 3 without;
+    # pace just under the published limit across all worker threads
+    REQUESTS_PER_SECOND_WITH_KEY = 9
+    REQUESTS_PER_SECOND_WITHOUT_KEY = 3
+    
+    # Max results per query, and efetch page size (NCBI recommends batches of 200)
+    MAX_RESULTS = 500
+    BATCH_SIZE = 200
+    
+    # Compiled once; evaluated by libxml2 for every article. Paths are
+    # relative to PubmedArticle/Article so lookups are child steps, not subtree scans
+    _XP_PMID = ET.XPath('MedlineCitation/PMID')
+    _XP_ARTICLE = ET.XPath('MedlineCitation/Article')
+    _XP_TITLE = ET.XPath('ArticleTitle')
+    _XP_JOURNAL_TITLE = ET.XPath('Journal/Title')
+    
     def __init__(self, api_key: str, search_queries: List[str], days_lookback: int = 1):
         self.api_key = api_key
         self.search_queries = search_queries
         self.days_lookback = days_lookback
+        rate = self.REQUESTS_PER_SECOND_WITH_KEY if api_key else self.REQUESTS_PER_SECOND_WITHOUT_KEY
+        self.rate_limiter = RateLimiter(rate)
+        self._init_session()
     
     def fetch(self) -> List[Dict]:
         """Fetch papers from PubMed for all configured search queries."""
-        all_papers = []
-        seen_ids = set()
+        if not self.search_queries:
+            return []
         
-        for query in self.search_queries:
-            logger.info(f"Searching PubMed with query: {query}")
-            try:
-                # Step 1: Search for PMIDs
-                pmids = self._search_pmids(query)
-                logger.info(f"Found {len(pmids)} PMIDs for query: {query}")
-                
-                if not pmids:
-                    continue
-                
-                # Step 2: Fetch details for PMIDs
-                papers = self._fetch_details(pmids)
-                
-                # Deduplicate
-                for paper in papers:
-                    if paper['pubmed_id'] not in seen_ids:
-                        seen_ids.add(paper['pubmed_id'])
-                        all_papers.append(paper)
-                
-            except Exception as e:
-                logger.error(f"Error fetching PubMed papers for query '{query}': {e}")
-                continue
+        # Queries are independent network round-trips; run them concurrently
+        # on the shared session and merge in query order afterwards
+        with ThreadPoolExecutor(max_workers=min(8, len(self.search_queries))) as executor:
+            date_query = self._date_query()
+            results = list(executor.map(lambda query: self._fetch_query(query, date_query), self.search_queries))
+        
+        # Deduplicate, keeping the first occurrence of each PMID
+        merged: Dict[str, Dict] = {}
+        for papers in results:
+            for paper in papers:
+                merged.setdefault(paper['pubmed_id'], paper)
+        all_papers = list(merged.values())
         
         logger.info(f"Total unique papers from PubMed: {len(all_papers)}")
         return all_papers
     
-    def _search_pmids(self, query: str) -> List[str]:
-        """Search PubMed and return list of PMIDs."""
-        # Build date filter
+    def _fetch_query(self, query: str, date_query: str) -> List[Dict]:
+        """Search and fetch details for a single query."""
+        logger.info(f"Searching PubMed with query: {query}")
+        try:
+            # Step 1: Search, leaving the PMIDs on the history server
+            handle = self._search(query, date_query)
+            count = handle.count if handle else 0
+            logger.info(f"Found {count} PMIDs for query: {query}")
+            
+            if not count:
+                return []
+            
+            # Step 2: Fetch details straight from the stored result set
+            return self._fetch_details(handle)
+            
+        except Exception as e:
+            logger.error(f"Error fetching PubMed papers for query '{query}': {e}")
+            return []
+    
+    def _date_query(self) -> str:
+        """Publication-date filter shared by every query in one fetch."""
         end_date = datetime.now(timezone.utc)
         start_date = end_date - timedelta(days=self.days_lookback)
-        
-        date_query = f"({start_date.strftime('%Y/%m/%d')}:{end_date.strftime('%Y/%m/%d')}[PDAT])"
+        return f"({start_date.strftime('%Y/%m/%d')}:{end_date.strftime('%Y/%m/%d')}[PDAT])"
+    
+    def _search(self, query: str, date_query: str) -> Optional[PubMedHandle]:
+        """Search PubMed and return a handle to the result set on the history server."""
         full_query = f"{query} AND {date_query}"
         
         params = {
             'db': 'pubmed',
             'term': full_query,
-            'retmax': 500,  # Max results
+            'retmax': 0,  # Only the count; efetch reads the ids server-side
             'retmode': 'json',
             'api_key': self.api_key,
             'sort': 'pub_date',
-            'usehistory': 'n'
+            'usehistory': 'y'
         }
         
         try:
             url = f"{self.BASE_URL}/esearch.fcgi"
-            response = requests.get(url, params=params, timeout=30)
+            self.rate_limiter.acquire()
+            response = self._get(url, params=params, timeout=30)
             response.raise_for_status()
             
-            data = response.json()
-            pmids = data.get('esearchresult', {}).get('idlist', [])
+            data = loads_json(response.content).get('esearchresult', {})
+            if 'webenv' not in data or 'querykey' not in data:
+                return None
             
-            return pmids
+            return PubMedHandle(
+                webenv=data['webenv'],
+                query_key=data['querykey'],
+                count=min(int(data.get('count', 0)), self.MAX_RESULTS)
+            )
             
         except Exception as e:
             logger.error(f"Error searching PubMed: {e}")
-            return []
+            return None
     
-    def _fetch_details(self, pmids: List[str]) -> List[Dict]:
-        """Fetch paper details for a list of PMIDs."""
-        if not pmids:
+    def _fetch_details(self, handle: PubMedHandle) -> List[Dict]:
+        """Fetch paper details for every record in a history-server result set."""
+        if not handle.count:
             return []
         
-        # PubMed API recommends batches of 200
-        batch_size = 200
-        papers = []
+        retstarts = list(range(0, handle.count, self.BATCH_SIZE))
         
-        for i in range(0, len(pmids), batch_size):
-            batch = pmids[i:i+batch_size]
-            
-            params = {
-                'db': 'pubmed',
-                'id': ','.join(batch),
-                'retmode': 'xml',
-                'api_key': self.api_key
-            }
-            
-            try:
-                url = f"{self.BASE_URL}/efetch.fcgi"
-                response = requests.get(url, params=params, timeout=60)
-                response.raise_for_status()
-                
-                batch_papers = self._parse_xml_response(response.text)
-                papers.extend(batch_papers)
-                
-                logger.info(f"Fetched details for {len(batch_papers)} papers (batch {i//batch_size + 1})")
-                
-            except Exception as e:
-                logger.error(f"Error fetching PubMed details for batch: {e}")
-                continue
+        # Pages are independent, so download them concurrently; the shared
+        # rate limiter keeps the combined request rate within NCBI's budget
+        with ThreadPoolExecutor(max_workers=min(8, len(retstarts))) as executor:
+            blobs = [blob for blob in executor.map(lambda start: self._fetch_batch(handle, start), retstarts) if blob]
+        
+        # A few 200-article pages parse in milliseconds with lxml, well under
+        # the cost of starting worker processes, so parse them inline
+        papers = []
+        for batch_num, batch_papers in enumerate(map(self._parse_xml_response, blobs), 1):
+            logger.info(f"Fetched details for {len(batch_papers)} papers (batch {batch_num})")
+            papers.extend(batch_papers)
         
         return papers
     
-    def _parse_xml_response(self, xml_text: str) -> List[Dict]:
+    def _fetch_batch(self, handle: PubMedHandle, retstart: int) -> Optional[bytes]:
+        """Download one page of the stored result set as raw efetch XML."""
+        params = {
+            'db': 'pubmed',
+            'WebEnv': handle.webenv,
+            'query_key': handle.query_key,
+            'retstart': retstart,
+            'retmax': min(self.BATCH_SIZE, handle.count - retstart),
+            'retmode': 'xml',
+            'api_key': self.api_key
+        }
+        
+        try:
+            url = f"{self.BASE_URL}/efetch.fcgi"
+            self.rate_limiter.acquire()
+            response = self._get(url, params=params, timeout=60)
+            response.raise_for_status()
+            return response.content
+            
+        except Exception as e:
+            logger.error(f"Error fetching PubMed details for batch: {e}")
+            return None
+    
+    @classmethod
+    def _parse_xml_response(cls, xml_bytes: bytes) -> List[Dict]:
         """Parse PubMed XML response into our standard format."""
         papers = []
         
         try:
-            root = ET.fromstring(xml_text)
+            # Stream one PubmedArticle at a time instead of building the whole tree
+            context = ET.iterparse(BytesIO(xml_bytes), events=('end',), tag='PubmedArticle')
             
-            for article in root.findall('.//PubmedArticle'):
+            for _, article in context:
                 try:
-                    paper = self._parse_article(article)
+                    paper = cls._parse_article(article)
                     if paper:
                         papers.append(paper)
                 except Exception as e:
                     logger.warning(f"Error parsing article: {e}")
-                    continue
+                finally:
+                    # Release the parsed article and any preceding siblings
+                    article.clear()
+                    while article.getprevious() is not None:
+                        del article.getparent()[0]
             
         except Exception as e:
             logger.error(f"Error parsing XML: {e}")
         
         return papers
     
-    def _parse_article(self, article) -> Optional[Dict]:
+    @classmethod
+    def _parse_article(cls, article) -> Optional[Dict]:
         """Parse a single PubMed article."""
         try:
             # Get PMID
-            pmid_elem = article.find('.//PMID')
-            if pmid_elem is None:
+            pmid_elems = cls._XP_PMID(article)
+            if not pmid_elems:
                 return None
-            pmid = pmid_elem.text
+            pmid = pmid_elems[0].text
             
             # Get article metadata
-            article_elem = article.find('.//Article')
-            if article_elem is None:
+            article_elems = cls._XP_ARTICLE(article)
+            if not article_elems:
                 return None
+            article_elem = article_elems[0]
             
             # Title
-            title_elem = article_elem.find('.//ArticleTitle')
-            title = title_elem.text if title_elem is not None and title_elem.text else "No title"
+            title_elems = cls._XP_TITLE(article_elem)
+            title = title_elems[0].text if title_elems and title_elems[0].text else "No title"
             
             # Abstract
             abstract_parts = []
-            abstract_elem = article_elem.find('.//Abstract')
+            abstract_elem = article_elem.find('Abstract')
             if abstract_elem is not None:
-                for text_elem in abstract_elem.findall('.//AbstractText'):
+                for text_elem in abstract_elem.iterfind('AbstractText'):
                     if text_elem.text:
                         # Handle labeled abstracts
                         label = text_elem.get('Label', '')
@@ -171,46 +250,49 @@ class PubMedFetcher:
             
             # Authors
             authors = []
-            author_list = article_elem.find('.//AuthorList')
+            author_list = article_elem.find('AuthorList')
             if author_list is not None:
-                for author in author_list.findall('.//Author'):
-                    last_name = author.find('.//LastName')
-                    fore_name = author.find('.//ForeName')
-                    if last_name is not None and last_name.text:
-                        author_name = last_name.text
-                        if fore_name is not None and fore_name.text:
-                            author_name = f"{fore_name.text} {author_name}"
+                for author in author_list.iterfind('Author'):
+                    last_name = author.findtext('LastName')
+                    fore_name = author.findtext('ForeName')
+                    if last_name:
+                        author_name = f"{fore_name} {last_name}" if fore_name else last_name
                         authors.append(author_name)
             
             # Journal
-            journal_elem = article_elem.find('.//Journal/Title')
-            journal = journal_elem.text if journal_elem is not None and journal_elem.text else "Unknown Journal"
+            journal_elems = cls._XP_JOURNAL_TITLE(article_elem)
+            journal = journal_elems[0].text if journal_elems and journal_elems[0].text else "Unknown Journal"
             
             # Publication date
-            pub_date_elem = article.find('.//PubmedData/History/PubMedPubDate[@PubStatus="pubmed"]')
+            pub_date_elem = article.find('PubmedData/History/PubMedPubDate[@PubStatus="pubmed"]')
             if pub_date_elem is None:
-                pub_date_elem = article.find('.//PubmedData/History/PubMedPubDate[@PubStatus="entrez"]')
+                pub_date_elem = article.find('PubmedData/History/PubMedPubDate[@PubStatus="entrez"]')
             if pub_date_elem is None:
-                pub_date_elem = article_elem.find('.//Journal/JournalIssue/PubDate')
+                pub_date_elem = article_elem.find('Journal/JournalIssue/PubDate')
             
-            published = self._parse_pubmed_date(pub_date_elem)
+            published = cls._parse_pubmed_date(pub_date_elem)
+            published_iso = published.isoformat() if published else None
             
             # DOI
             doi = None
-            article_id_list = article.find('.//PubmedData/ArticleIdList')
+            article_id_list = article.find('PubmedData/ArticleIdList')
             if article_id_list is not None:
-                for article_id in article_id_list.findall('.//ArticleId'):
+                for article_id in article_id_list.iterfind('ArticleId'):
                     if article_id.get('IdType') == 'doi':
                         doi = article_id.text
                         break
             
             # MeSH terms (keywords)
             mesh_terms = []
-            mesh_list = article.find('.//MeshHeadingList')
+            mesh_list = article.find('MedlineCitation/MeshHeadingList')
             if mesh_list is not None:
-                for mesh in mesh_list.findall('.//MeshHeading/DescriptorName'):
-                    if mesh.text:
-                        mesh_terms.append(mesh.text)
+                for mesh in mesh_list.iterfind('MeshHeading'):
+                    descriptor = mesh.findtext('DescriptorName')
+                    if descriptor:
+                        mesh_terms.append(descriptor)
+                        # Only the top 5 are kept
+                        if len(mesh_terms) == 5:
+                            break
             
             # Build URLs
             pubmed_link = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
@@ -223,10 +305,10 @@ class PubMedFetcher:
                 'abstract': abstract.strip(),
                 'authors': authors,
                 'journal': journal,
-                'categories': mesh_terms[:5],  # Limit to top 5 MeSH terms
+                'categories': mesh_terms,  # Top 5 MeSH terms
                 'primary_category': 'PubMed',
-                'published': published.isoformat() if published else None,
-                'updated': published.isoformat() if published else None,
+                'published': published_iso,
+                'updated': published_iso,
                 'pdf_link': pdf_link,
                 'pubmed_link': pubmed_link,
                 'arxiv_link': pubmed_link,  # Use pubmed_link as standard link
@@ -239,22 +321,18 @@ class PubMedFetcher:
             logger.error(f"Error parsing article: {e}")
             return None
     
-    def _parse_pubmed_date(self, date_elem) -> Optional[datetime]:
+    @staticmethod
+    def _parse_pubmed_date(date_elem) -> Optional[datetime]:
         """Parse PubMed date element to datetime."""
         if date_elem is None:
             return None
         
         try:
-            year_elem = date_elem.find('.//Year')
-            month_elem = date_elem.find('.//Month')
-            day_elem = date_elem.find('.//Day')
-            
-            year = int(year_elem.text) if year_elem is not None and year_elem.text else None
-            month = int(month_elem.text) if month_elem is not None and month_elem.text and month_elem.text.isdigit() else 1
-            day = int(day_elem.text) if day_elem is not None and day_elem.text else 1
-            
-            if year:
-                return datetime(year, month, day, tzinfo=timezone.utc)
+            return _ymd_to_datetime(
+                date_elem.findtext('Year'),
+                date_elem.findtext('Month'),
+                date_elem.findtext('Day')
+            )
         except Exception as e:
             logger.warning(f"Error parsing date: {e}")
         
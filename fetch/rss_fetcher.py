@@ -1,55 +1,92 @@
-import feedparser
+import json
 import logging
+import os
+import threading
 from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
-import pytz
-from dateutil import parser as date_parser
+from email.utils import parsedate_to_datetime
+from lxml import etree as ET
+
+from limiters import RateLimiter
+from ._http import SessionMixin, CACHE_DIR
+
+try:
+    from ciso8601 import parse_datetime as _parse_iso
+except ImportError:  # optional C parser; stdlib handles arXiv's ISO-8601 dates
+    def _parse_iso(date_str: str) -> datetime:
+        return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
 
 logger = logging.getLogger(__name__)
 
-class RSSFetcher:
+NS = {
+    'a': 'http://www.w3.org/2005/Atom',
+    'arxiv': 'http://arxiv.org/schemas/atom',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+}
+
+class RSSFetcher(SessionMixin):
     """Fetches papers from arXiv RSS/Atom feeds."""
     
     BASE_URL = "https://rss.arxiv.org/atom"
     
+    # arXiv asks automated clients for roughly one request every 3 seconds;
+    # allow a small initial burst, then pace the remaining feeds
+    REQUESTS_PER_SECOND = 1 / 3
+    MAX_BURST = 4
+    
+    # Feed validators persisted between runs so unchanged feeds are not
+    # downloaded again, and the feed bodies they validate
+    VALIDATORS_PATH = os.path.join(CACHE_DIR, 'rss_etags.json')
+    FEEDS_DIR = os.path.join(CACHE_DIR, 'rss_feeds')
+    
+    # arXiv feeds have a fixed Atom schema, so read the handful of fields we
+    # need with compiled XPath instead of a general-purpose feed parser
+    _PARSER = ET.XMLParser(recover=True, resolve_entities=False)
+    _XP_ENTRY = ET.XPath('a:entry', namespaces=NS)
+    _XP_ID = ET.XPath('string(a:id)', namespaces=NS)
+    _XP_TITLE = ET.XPath('string(a:title)', namespaces=NS)
+    _XP_SUMMARY = ET.XPath('string(a:summary)', namespaces=NS)
+    _XP_PUBLISHED = ET.XPath('string(a:published)', namespaces=NS)
+    _XP_UPDATED = ET.XPath('string(a:updated)', namespaces=NS)
+    _XP_AUTHORS = ET.XPath('a:author/a:name/text()', namespaces=NS)
+    _XP_CREATORS = ET.XPath('dc:creator/text()', namespaces=NS)
+    _XP_CATEGORIES = ET.XPath('a:category/@term', namespaces=NS)
+    _XP_ALT_LINK = ET.XPath('string(a:link[@rel="alternate"][1]/@href)', namespaces=NS)
+    _XP_LINK = ET.XPath('string(a:link[1]/@href)', namespaces=NS)
+    _XP_COMMENT = ET.XPath('string(arxiv:comment)', namespaces=NS)
+    
     def __init__(self, categories: List[str], hours_lookback: int = 48, config: dict = None):
         self.categories = categories
         self.hours_lookback = hours_lookback
-        self.et_tz = pytz.timezone('America/New_York')
         self.config = config or {}
+        self.rate_limiter = RateLimiter(self.REQUESTS_PER_SECOND, self.MAX_BURST)
+        self._init_session()
+        self._feed_validators = self._load_feed_validators()
+        self._validators_lock = threading.Lock()
     
     def fetch(self) -> List[Dict]:
         """Fetch papers from RSS feeds for all configured categories."""
         all_entries = []
         seen_ids = set()
         
-        # Fetch each category separately to avoid URL length issues
-        for category in self.categories:
-            url = f"{self.BASE_URL}/{category}"
-            logger.info(f"Fetching RSS feed for {category} from {url}")
-            
-            try:
-                feed = feedparser.parse(url)
-                
-                if feed.bozo:
-                    logger.warning(f"Feed parsing warning for {category}: {feed.bozo_exception}")
-                
-                logger.info(f"Found {len(feed.entries)} entries in {category} feed")
-                
-                for entry in feed.entries:
-                    paper = self._parse_entry(entry, category)
-                    
-                    # Deduplicate by arXiv ID
-                    if paper['arxiv_id'] not in seen_ids:
-                        seen_ids.add(paper['arxiv_id'])
-                        all_entries.append(paper)
+        if not self.categories:
+            return []
+        
+        # Fetch each category separately to avoid URL length issues, but
+        # concurrently since each feed download blocks on the network
+        with ThreadPoolExecutor(max_workers=min(self.MAX_BURST, len(self.categories))) as executor:
+            results = list(executor.map(self._fetch_feed, self.categories))
+        
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for papers in results:
+            for paper in papers:
+                # Deduplicate by arXiv ID
+                if paper['arxiv_id'] not in seen_ids:
+                    seen_ids.add(paper['arxiv_id'])
+                    all_entries.append(paper)
+                    if debug:
                         logger.debug(f"Added paper: {paper['arxiv_id']} - {paper['title'][:50]}...")
-                
-                logger.info(f"Processed {len(feed.entries)} entries from {category}")
-                
-            except Exception as e:
-                logger.error(f"Error fetching {category}: {e}")
-                continue
         
         # Filter by date
         filtered = self._filter_by_date(all_entries)
@@ -63,11 +100,125 @@ class RSSFetcher:
         
         return filtered
     
-    def _parse_entry(self, entry: Dict, category: str) -> Dict:
-        """Parse a feed entry into our standard format."""
+    def _fetch_feed(self, category: str) -> List[Dict]:
+        """Download and parse the feed for a single category."""
+        url = f"{self.BASE_URL}/{category}"
+        logger.info(f"Fetching RSS feed for {category} from {url}")
+        
+        try:
+            # An unchanged feed is parsed from the copy saved with its
+            # validators, so a rerun still sees every paper in it
+            content = self._cached_feed(category) if self._feed_unchanged(category, url) else None
+            if content is not None:
+                logger.info(f"Feed for {category} unchanged since last run, using saved copy")
+            else:
+                self.rate_limiter.acquire()
+                response = self._get(url, timeout=30)
+                response.raise_for_status()
+                content = response.content
+                self._save_feed(category, content)
+                self._remember_validators(category, response)
+            
+            # Parse the downloaded bytes in this worker so XML parsing of one
+            # feed overlaps with downloads of the others
+            root = ET.fromstring(content, self._PARSER)
+            if root is None:
+                logger.warning(f"Feed parsing warning for {category}: empty document")
+                return []
+            entries = self._XP_ENTRY(root)
+            
+            logger.info(f"Found {len(entries)} entries in {category} feed")
+            
+            papers = [self._parse_entry(entry, category) for entry in entries]
+            
+            logger.info(f"Processed {len(entries)} entries from {category}")
+            return papers
+            
+        except Exception as e:
+            logger.error(f"Error fetching {category}: {e}")
+            return []
+    
+    def _feed_path(self, category: str) -> str:
+        return os.path.join(self.FEEDS_DIR, f"{category}.xml")
+    
+    def _cached_feed(self, category: str) -> Optional[bytes]:
+        """Return the feed body saved by a previous run, or None if there is none."""
+        try:
+            with open(self._feed_path(category), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def _save_feed(self, category: str, content: bytes):
+        """Keep a feed body for reuse when the feed next answers 304."""
+        path = self._feed_path(category)
+        try:
+            os.makedirs(self.FEEDS_DIR, exist_ok=True)
+            # Write then rename, so a crash never leaves a truncated copy
+            partial_path = f"{path}.part"
+            with open(partial_path, 'wb') as f:
+                f.write(content)
+            os.replace(partial_path, path)
+        except OSError as e:
+            logger.warning(f"Could not save RSS feed for {category}: {e}")
+    
+    def _feed_unchanged(self, category: str, url: str) -> bool:
+        """Cheap conditional HEAD against the validators saved by a previous run."""
+        validators = self._feed_validators.get(category)
+        if not validators or not os.path.exists(self._feed_path(category)):
+            return False
+        
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        if not headers:
+            return False
+        
+        try:
+            self.rate_limiter.acquire()
+            response = self.session.head(url, headers=headers, timeout=10)
+            return response.status_code == 304
+        except Exception as e:
+            logger.debug(f"HEAD pre-flight failed for {category}: {e}")
+            return False
+    
+    def _remember_validators(self, category: str, response):
+        """Record a feed's ETag/Last-Modified for the next run."""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            with self._validators_lock:
+                self._feed_validators[category] = {'etag': etag, 'last_modified': last_modified}
+    
+    def _load_feed_validators(self) -> Dict[str, Dict]:
+        """Load persisted feed validators, starting empty if none are readable."""
+        try:
+            with open(self.VALIDATORS_PATH) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_feed_validators(self):
+        """
+        Persist feed validators; failures only cost a full download next run.
+        
+        Called by the orchestrator once a run has completed, so a run that
+        fails part way downloads the feeds again next time.
+        """
+        try:
+            os.makedirs(os.path.dirname(self.VALIDATORS_PATH), exist_ok=True)
+            with open(self.VALIDATORS_PATH, 'w') as f:
+                json.dump(self._feed_validators, f)
+        except OSError as e:
+            logger.warning(f"Could not save RSS feed validators: {e}")
+    
+    def _parse_entry(self, entry, category: str) -> Dict:
+        """Parse an Atom <entry> element into our standard format."""
         # Extract arXiv ID from the entry ID
         # Handle both formats: "oai:arXiv.org:2508.10269v1" and "http://arxiv.org/abs/2508.10269v1"
-        entry_id = entry.id if 'id' in entry else ''
+        entry_id = self._XP_ID(entry).strip()
         if 'oai:arXiv.org:' in entry_id:
             arxiv_id = entry_id.replace('oai:arXiv.org:', '')
         elif 'arxiv.org/abs/' in entry_id:
@@ -76,39 +227,32 @@ class RSSFetcher:
             arxiv_id = entry_id.split('/')[-1] if entry_id else ''
         
         # Parse dates
-        published = self._parse_date(entry.get('published', ''))
-        updated = self._parse_date(entry.get('updated', ''))
-        
-        # Extract authors
-        authors = []
-        if 'authors' in entry:
-            authors = [author.get('name', '') for author in entry.authors]
-        elif 'author_detail' in entry:
-            authors = [entry.author_detail.get('name', '')]
-        elif 'author' in entry:
-            authors = [entry.author]
-        
-        # Extract categories from tags
-        categories = []
-        if 'tags' in entry:
-            categories = [tag.get('term', '') for tag in entry.tags]
+        published = self._parse_date(self._XP_PUBLISHED(entry).strip())
+        updated = self._parse_date(self._XP_UPDATED(entry).strip())
+        
+        # Extract authors (arXiv's RSS feeds use dc:creator instead of atom:author)
+        authors = [str(name) for name in self._XP_AUTHORS(entry)]
+        if not authors:
+            authors = [str(name) for name in self._XP_CREATORS(entry)]
+        
+        # Extract categories
+        categories = [str(term) for term in self._XP_CATEGORIES(entry)]
         
         # Get PDF link
         pdf_link = f"https://arxiv.org/pdf/{arxiv_id}.pdf" if arxiv_id else ''
         
         # Get arXiv page link
-        if 'link' in entry:
-            arxiv_link = entry.link
-        else:
+        arxiv_link = self._XP_ALT_LINK(entry) or self._XP_LINK(entry)
+        if not arxiv_link:
             arxiv_link = f"https://arxiv.org/abs/{arxiv_id}" if arxiv_id else ''
         
         # Extract comments (may contain code/data links)
-        comments = entry.get('arxiv_comment', '')
+        comments = self._XP_COMMENT(entry).strip()
         
         return {
             'arxiv_id': arxiv_id,
-            'title': entry.get('title', '').replace('\n', ' ').strip(),
-            'abstract': entry.get('summary', '').replace('\n', ' ').strip(),
+            'title': self._XP_TITLE(entry).replace('\n', ' ').strip(),
+            'abstract': self._XP_SUMMARY(entry).replace('\n', ' ').strip(),
             'authors': authors,
             'categories': categories,
             'primary_category': category,
@@ -125,16 +269,23 @@ class RSSFetcher:
         if not date_str:
             return None
         try:
-            return date_parser.parse(date_str)
-        except:
+            # arXiv Atom dates are strict ISO-8601
+            return _parse_iso(date_str)
+        except ValueError:
+            pass
+        try:
+            # RSS 2.0 style RFC 822 dates
+            return parsedate_to_datetime(date_str)
+        except (TypeError, ValueError):
             return None
     
     def _extract_version(self, arxiv_id: str) -> int:
         """Extract version number from arXiv ID."""
-        if 'v' in arxiv_id:
+        _, sep, tail = arxiv_id.rpartition('v')
+        if sep:
             try:
-                return int(arxiv_id.split('v')[-1])
-            except:
+                return int(tail)
+            except ValueError:
                 pass
         return 1
     
@@ -144,8 +295,11 @@ class RSSFetcher:
         
         logger.info(f"Filtering papers published after {cutoff}")
         
-        filtered = []
         only_new = self.config.get('digest', {}).get('fetch', {}).get('only_new_submissions', False)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        
+        filtered = []
+        append = filtered.append
         
         for entry in entries:
             # For new submissions only, use published date
@@ -154,15 +308,17 @@ class RSSFetcher:
                 entry_date = entry.get('published')
                 # Skip updates (v2, v3, etc.)
                 if entry.get('version', 1) > 1:
-                    logger.debug(f"Skipping update v{entry.get('version')}: {entry['title'][:50]}...")
+                    if debug:
+                        logger.debug(f"Skipping update v{entry.get('version')}: {entry['title'][:50]}...")
                     continue
             else:
                 entry_date = entry.get('updated') or entry.get('published')
             
             if entry_date and entry_date > cutoff:
-                filtered.append(entry)
-                logger.debug(f"Keeping paper from {entry_date}: {entry['title'][:50]}...")
-            elif entry_date:
+                append(entry)
+                if debug:
+                    logger.debug(f"Keeping paper from {entry_date}: {entry['title'][:50]}...")
+            elif entry_date and debug:
                 logger.debug(f"Filtering out old paper from {entry_date}: {entry['title'][:50]}...")
         
         logger.info(f"Kept {len(filtered)} papers (new submissions only: {only_new})")
@@ -6,6 +6,8 @@ import re
 
 logger = logging.getLogger(__name__)
 
+_VERSION_RE = re.compile(r'v(\d+)$')
+
 class SearchAPIFetcher:
     """Supplementary fetcher using arXiv search API for more complex queries."""
     
@@ -69,5 +71,5 @@ class SearchAPIFetcher:
     
     def _extract_version(self, arxiv_id: str) -> int:
         """Extract version number from arXiv ID."""
-        match = re.search(r'v(\d+)$', arxiv_id)
+        match = _VERSION_RE.search(arxiv_id)
         return int(match.group(1)) if match else 1
\ No newline at end of file
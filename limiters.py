@@ -0,0 +1,45 @@
+import threading
+import time
+from typing import Dict
+
+class RateLimiter:
+    """Thread-safe token bucket: at most `rate` requests per second, bursting to `max_tokens`."""
+
+    def __init__(self, rate: float, max_tokens: float = 1):
+        self.rate = rate
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request token is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.max_tokens, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class DomainLimiter:
+    """Thread-safe per-host pacing: requests to one host start at least `min_delay` seconds apart."""
+    
+    def __init__(self, min_delay: float = 0.2):
+        self.min_delay = min_delay
+        self._next_allowed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, host: str):
+        """Reserve the host's next slot and sleep until it arrives; other hosts are unaffected."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = slot + self.min_delay
+        
+        if slot > now:
+            time.sleep(slot - now)
@@ -0,0 +1,104 @@
+import sqlite3
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class LLMCache:
+    """Content-addressed SQLite cache for raw LLM response text."""
+
+    def __init__(self, path: str = ".cache/llm.sqlite", ttl_hours: Optional[float] = None, enabled: bool = True):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600 if ttl_hours else None
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if self.enabled:
+            self._init_db()
+
+    def _init_db(self):
+        """Open the cache database, disabling the cache if that fails."""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # Shared by the classifier's worker threads; access is serialized by _lock
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response_json TEXT,
+                    created_at INTEGER
+                )
+            """)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache disabled, could not open {self.path}: {e}")
+            self.enabled = False
+            self._conn = None
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Hash everything that determines the response into a cache key."""
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response text, or None on a miss or expired entry."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response_json, created_at FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        if self.ttl_seconds and time.time() - row[1] > self.ttl_seconds:
+            return None
+        return row[0]
+
+    def set(self, key: str, response_json: str):
+        """Store response text under key."""
+        if not self.enabled:
+            return
+
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response_json, created_at) VALUES (?, ?, ?)",
+                    (key, response_json, int(time.time()))
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to write LLM cache entry: {e}")
+
+    def close(self):
+        """Close the underlying connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            self.enabled = False
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'LLMCache':
+        """
+        Build a cache from the `llm` section of the app config.
+
+        Keys cover model, prompt and schema but not sampling settings, so the
+        cache is only enabled for deterministic (temperature 0) generation.
+        """
+        llm_config = (config or {}).get('llm', {})
+        return cls(
+            path=llm_config.get('cache_path', '.cache/llm.sqlite'),
+            ttl_hours=llm_config.get('cache_ttl_hours'),
+            enabled=llm_config.get('cache_enabled', True) and llm_config.get('temperature', 0) == 0
+        )
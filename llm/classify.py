@@ -1,23 +1,82 @@
 import google.generativeai as genai
+import fastjsonschema
 import json
+import itertools
 import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
-from tenacity import retry, stop_after_attempt, wait_exponential
+from google.api_core.exceptions import DeadlineExceeded, ResourceExhausted
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 import os
 
+from rules.heuristics import HeuristicFilter
+from . import _json
+from .cache import LLMCache
+from .client import model_from_config
+from .rate_limit import TokenBucket
+from .semantic_cache import SemanticCache
+
 logger = logging.getLogger(__name__)
 
+_WS = re.compile(r'\s+')
+
+
+def _dedup(*lists) -> List:
+    """Concatenate lists, dropping repeats but keeping first-seen order."""
+    return list(dict.fromkeys(itertools.chain.from_iterable(lists)))
+
+
 class GeminiClassifier:
     """Classify papers using Gemini 2.5 Pro with structured output."""
     
-    def __init__(self, api_key: str, config: dict):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-pro')
+    # Per-paper user turn; the static instructions go in the system instruction
+    PAPER_FIELDS_TEMPLATE = (
+        "Title: {title}\n"
+        "Categories: {categories}\n"
+        "Abstract: {abstract}\n"
+        "Comments: {comments}\n"
+        "{bucket_hints}"
+    )
+    PAPER_PROMPT_TEMPLATE = (
+        "PAPER TO EVALUATE:\n"
+        + PAPER_FIELDS_TEMPLATE +
+        "\n\n"
+        "Provide your evaluation as JSON matching the schema."
+    )
+    MULTI_PROMPT_HEADER = (
+        "Evaluate each of the following {count} papers independently. Return a JSON array "
+        "with exactly {count} evaluations matching the schema, one per paper, in the same order."
+    )
+    
+    def __init__(self, api_key: str, config: dict, model: genai.GenerativeModel = None):
         self.config = config
         self.buckets = config['buckets']
         
-        # Build the system prompt
+        # Shared across worker threads; extract_links holds no mutable state
+        self.heuristic = HeuristicFilter(config)
+        # Keeps each paper's multi-line log block together when classifying concurrently
+        self._log_lock = threading.Lock()
+        
+        # Responses are cached across runs, keyed on everything that shapes them
+        self.cache = LLMCache.from_config(config)
+        # Near-duplicate abstracts (new versions, cross-posts) reuse an earlier classification
+        self.semantic_cache = SemanticCache.from_config(config)
+        # Pace concurrent calls below the account's RPM/TPM instead of waiting for 429s
+        self.limiter = TokenBucket.from_config(config)
+        
+        llm_config = config.get('llm', {})
+        self.max_abstract_chars = llm_config.get('max_abstract_chars', 2000)
+        self.max_comments_chars = llm_config.get('max_comments_chars', 500)
+        self.temperature = llm_config.get('temperature', 0)
+        # Gemini calls kept in flight at once; the limiter still enforces RPM/TPM
+        self.concurrency = llm_config.get('gemini_concurrency', 8)
+        
+        # Build the system prompt once and hand it to the model as its system
+        # instruction, so per-paper requests carry only the paper itself
         self.system_prompt = self._build_system_prompt()
+        self.model = model or model_from_config(api_key, self.system_prompt, config)
         
         # Define the response schema (WITHOUT minimum/maximum constraints)
         self.response_schema = {
@@ -50,6 +109,9 @@ class GeminiClassifier:
             },
             "required": ["keep", "relevance_score", "buckets", "why_it_matters", "summary"]
         }
+        self._schema_json = json.dumps(self.response_schema, sort_keys=True)
+        # Compiled once; validating a response is then a single function call
+        self._validate = fastjsonschema.compile(self.response_schema)
     
     def _build_system_prompt(self) -> str:
         """Build the system prompt for Gemini."""
@@ -137,92 +199,164 @@ Extract any GitHub, GitLab, project page, or dataset URLs from the abstract and
 
 IMPORTANT: Return relevance_score as a number between 0 and 100. Be selective - most papers should score below 60. Focus on papers that could actually impact patient care, drug discovery, or neurotech applications."""
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential_jitter(initial=1, max=30),
+        retry=retry_if_exception_type((ResourceExhausted, DeadlineExceeded)),
+        reraise=True
+    )
+    def _generate(self, prompt: str, response_schema: Dict = None):
+        """Call Gemini, retrying only on quota and timeout errors."""
+        # Rough token estimate: ~4 characters per token, plus the system instruction
+        self.limiter.acquire(tokens=(len(self.system_prompt) + len(prompt)) // 4)
+        return self.model.generate_content(
+            prompt,
+            generation_config={
+                "response_mime_type": "application/json",
+                "response_schema": response_schema or self.response_schema,
+                "temperature": self.temperature,
+                "top_p": 0.95,
+            }
+        )
+    
     def classify_single(self, paper: Dict) -> Dict:
         """Classify a single paper."""
         prompt = self._build_paper_prompt(paper)
         
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config={
-                    "response_mime_type": "application/json",
-                    "response_schema": self.response_schema,
-                    "temperature": 0.3,
-                    "top_p": 0.95,
-                }
-            )
+            cache_key = self.cache.make_key(self.model.model_name, self.system_prompt, prompt, self._schema_json)
+            response_text = self.cache.get(cache_key)
+            
+            if response_text is None:
+                response = self._generate(prompt)
+                response_text = response.text
+                result = _json.loads(response_text)
+                self._validate(result)
+                self.cache.set(cache_key, response_text)
+            else:
+                logger.debug(f"LLM cache hit for {paper.get('arxiv_id')}")
+                result = _json.loads(response_text)
+                self._validate(result)
             
-            result = json.loads(response.text)
+            return self._apply_result(paper, result)
             
-            # Validate relevance_score is within bounds
-            if 'relevance_score' in result:
-                result['relevance_score'] = max(0, min(100, result['relevance_score']))
+        except Exception as e:
+            logger.error(f"  ⚠️ ERROR classifying {paper.get('arxiv_id')}: {e}")
+            logger.error(f"     Title: {paper.get('title')[:60]}...")
+            # Return with default values but mark as robotics-related for debugging
+            paper.update({
+                'keep': True,  # Keep by default for debugging
+                'relevance_score': 30,  # Low score
+                'buckets': [],
+                'why_it_matters': f'Classification failed: {str(e)}',
+                'summary': 'Classification error - marked for review',
+                'error': str(e)
+            })
+            return paper
+    
+    def classify_multi(self, papers: List[Dict]) -> List[Dict]:
+        """Classify several papers with one Gemini call, falling back to one call per paper."""
+        if len(papers) == 1:
+            return [self.classify_single(papers[0])]
+        
+        prompt = self._build_multi_prompt(papers)
+        # Gemini's schema dialect spells the length bounds min_items/max_items
+        array_schema = {
+            "type": "array",
+            "items": self.response_schema,
+            "min_items": len(papers),
+            "max_items": len(papers)
+        }
+        
+        try:
+            cache_key = self.cache.make_key(self.model.model_name, self.system_prompt, prompt, self._schema_json, 'array')
+            response_text = self.cache.get(cache_key)
             
-            # Detailed logging for debugging
-            title = paper.get('title', '')[:60] + "..."
-            arxiv_id = paper.get('arxiv_id', '')
+            if response_text is None:
+                response = self._generate(prompt, array_schema)
+                response_text = response.text
+                results = _json.loads(response_text)
+                self._validate_multi(results, len(papers))
+                self.cache.set(cache_key, response_text)
+            else:
+                logger.debug(f"LLM cache hit for {len(papers)}-paper group")
+                results = _json.loads(response_text)
+                self._validate_multi(results, len(papers))
             
-            logger.info(f"\n{'='*80}")
-            logger.info(f"📄 PAPER: {arxiv_id}")
-            logger.info(f"📝 TITLE: {paper.get('title', '')}")
-            logger.info(f"🏷️  CATEGORIES: {', '.join(paper.get('categories', []))}")
-            logger.info(f"📋 ABSTRACT: {paper.get('abstract', '')[:200]}...")
+        except Exception as e:
+            logger.warning(f"Grouped classification of {len(papers)} papers failed ({e}); classifying individually")
+            return [self.classify_single(paper) for paper in papers]
+        
+        return [self._apply_result(paper, result) for paper, result in zip(papers, results)]
+    
+    def _validate_multi(self, results, count: int):
+        """Check a grouped response is one schema-valid evaluation per paper."""
+        if not isinstance(results, list) or len(results) != count:
+            raise ValueError(f"expected {count} evaluations, got {len(results) if isinstance(results, list) else type(results).__name__}")
+        for result in results:
+            self._validate(result)
+    
+    def _apply_result(self, paper: Dict, result: Dict) -> Dict:
+        """Merge a validated evaluation into the paper."""
+        # Clamp relevance_score (the schema can't carry minimum/maximum)
+        result['relevance_score'] = max(0, min(100, result['relevance_score']))
+        
+        # Detailed logging for debugging
+        self._log_result(paper, result)
+        
+        # Merge with paper data
+        paper.update(result)
+        
+        # Add any heuristically detected links
+        code_urls, dataset_urls = self.heuristic.extract_links(paper)
+        
+        # Merge URLs (avoiding duplicates)
+        paper['code_urls'] = _dedup(paper.get('code_urls', []), code_urls)
+        paper['dataset_urls'] = _dedup(paper.get('dataset_urls', []), dataset_urls)
+        
+        return paper
+    
+    def _log_result(self, paper: Dict, result: Dict):
+        """Log the classification decision for a paper."""
+        # Skip building the per-paper report entirely when INFO is off
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        
+        rule = '=' * 80
+        
+        with self._log_lock:
+            logger.info("\n%s", rule)
+            logger.info("📄 PAPER: %s", paper.get('arxiv_id', ''))
+            logger.info("📝 TITLE: %s", paper.get('title', ''))
+            logger.info("🏷️  CATEGORIES: %s", ', '.join(paper.get('categories', [])))
+            logger.info("📋 ABSTRACT: %s...", paper.get('abstract', '')[:200])
             
             if result.get('keep', False):
-                logger.info(f"✅ DECISION: KEEP")
-                logger.info(f"📊 SCORE: {result.get('relevance_score')}/100")
-                logger.info(f"🎯 BUCKETS: {', '.join(result.get('buckets', []))}")
-                logger.info(f"💡 WHY IT MATTERS: {result.get('why_it_matters', '')}")
-                logger.info(f"📝 SUMMARY: {result.get('summary', '')}")
+                logger.info("✅ DECISION: KEEP")
+                logger.info("📊 SCORE: %s/100", result.get('relevance_score'))
+                logger.info("🎯 BUCKETS: %s", ', '.join(result.get('buckets', [])))
+                logger.info("💡 WHY IT MATTERS: %s", result.get('why_it_matters', ''))
+                logger.info("📝 SUMMARY: %s", result.get('summary', ''))
             else:
-                logger.info(f"❌ DECISION: DROP")
-                logger.info(f"📊 SCORE: {result.get('relevance_score')}/100")
-                logger.info(f"💡 WHY IT MATTERS: {result.get('why_it_matters', '')}")
-                logger.info(f"📝 SUMMARY: {result.get('summary', '')}")
+                logger.info("❌ DECISION: DROP")
+                logger.info("📊 SCORE: %s/100", result.get('relevance_score'))
+                logger.info("💡 WHY IT MATTERS: %s", result.get('why_it_matters', ''))
+                logger.info("📝 SUMMARY: %s", result.get('summary', ''))
             
             # Log any risk flags
             risk_flags = result.get('risk_flags', [])
             if risk_flags:
-                logger.info(f"⚠️  RISK FLAGS: {', '.join(risk_flags)}")
+                logger.info("⚠️  RISK FLAGS: %s", ', '.join(risk_flags))
             
             # Log any detected URLs
             code_urls = result.get('code_urls', [])
             dataset_urls = result.get('dataset_urls', [])
             if code_urls:
-                logger.info(f"🔗 CODE URLs: {', '.join(code_urls)}")
+                logger.info("🔗 CODE URLs: %s", ', '.join(code_urls))
             if dataset_urls:
-                logger.info(f"📊 DATASET URLs: {', '.join(dataset_urls)}")
-            
-            logger.info(f"{'='*80}")
-            
-            # Merge with paper data
-            paper.update(result)
-            
-            # Add any heuristically detected links
-            from rules.heuristics import HeuristicFilter
-            heuristic = HeuristicFilter(self.config)
-            code_urls, dataset_urls = heuristic.extract_links(paper)
-            
-            # Merge URLs (avoiding duplicates)
-            paper['code_urls'] = list(set(paper.get('code_urls', []) + code_urls))
-            paper['dataset_urls'] = list(set(paper.get('dataset_urls', []) + dataset_urls))
+                logger.info("📊 DATASET URLs: %s", ', '.join(dataset_urls))
             
-            return paper
-            
-        except Exception as e:
-            logger.error(f"  ⚠️ ERROR classifying {paper.get('arxiv_id')}: {e}")
-            logger.error(f"     Title: {paper.get('title')[:60]}...")
-            # Return with default values but mark as robotics-related for debugging
-            paper.update({
-                'keep': True,  # Keep by default for debugging
-                'relevance_score': 30,  # Low score
-                'buckets': [],
-                'why_it_matters': f'Classification failed: {str(e)}',
-                'summary': 'Classification error - marked for review',
-                'error': str(e)
-            })
-            return paper
+            logger.info(rule)
     
     def classify_batch(self, papers: List[Dict], batch_size: int = 5) -> List[Dict]:
         """Classify papers in batches for efficiency."""
@@ -230,18 +364,53 @@ IMPORTANT: Return relevance_score as a number between 0 and 100. Be selective -
         
         logger.info(f"Starting classification of {len(papers)} papers...")
         
-        for i in range(0, len(papers), batch_size):
-            batch = papers[i:i+batch_size]
+        # Obvious non-targets are settled locally without a Gemini call
+        llm_config = self.config.get('llm', {})
+        if llm_config.get('pre_filter_enabled', True):
+            strict = llm_config.get('pre_filter_strict', False)
+            verdicts = [self.heuristic.pre_screen(paper, strict) for paper in papers]
+        else:
+            verdicts = [('uncertain', '')] * len(papers)
+        pending = [i for i, (verdict, _) in enumerate(verdicts) if verdict != 'drop']
+        
+        skipped = len(papers) - len(pending)
+        if skipped:
+            logger.info(f"Pre-screen dropped {skipped} papers without calling Gemini")
+        
+        # Reuse classifications of near-duplicate abstracts from earlier runs
+        embeddings = {}
+        semantic_hits = {}
+        if self.semantic_cache.enabled and pending:
+            vectors = self.semantic_cache.embed([self._semantic_text(papers[i]) for i in pending])
+            for i, vector in zip(pending, vectors):
+                embeddings[i] = vector
+                response_text = self.semantic_cache.lookup(vector)
+                if response_text is not None:
+                    semantic_hits[i] = response_text
+            if semantic_hits:
+                logger.info(f"Semantic cache matched {len(semantic_hits)} papers without calling Gemini")
+        
+        to_classify = [papers[i] for i in pending if i not in semantic_hits]
+        
+        # Send batch_size papers per Gemini call and keep up to
+        # gemini_concurrency calls in flight; map() preserves input order
+        groups = [to_classify[i:i+batch_size] for i in range(0, len(to_classify), batch_size)]
+        with ThreadPoolExecutor(max_workers=max(1, min(self.concurrency, len(groups)))) as executor:
+            results = (result for group in executor.map(self.classify_multi, groups) for result in group)
             
-            # For simplicity, process one by one
-            # (Gemini structured output works best with single items)
-            for paper in batch:
-                result = self.classify_single(paper)
+            for i, (paper, (verdict, reason)) in enumerate(zip(papers, verdicts)):
+                if verdict == 'drop':
+                    result = self._heuristic_drop(paper, reason)
+                elif i in semantic_hits:
+                    result = self._apply_result(paper, _json.loads(semantic_hits[i]))
+                else:
+                    result = next(results)
+                    if i in embeddings and 'error' not in result:
+                        self.semantic_cache.add(embeddings[i], self._semantic_response(result))
                 classified.append(result)
                 
-                logger.info(f"Classified {paper['arxiv_id']}: "
-                          f"keep={result.get('keep')}, "
-                          f"score={result.get('relevance_score')}")
+                logger.info("Classified %s: keep=%s, score=%s",
+                            paper['arxiv_id'], result.get('keep'), result.get('relevance_score'))
         
         # Log summary
         kept = [p for p in classified if p.get('keep', False)]
@@ -249,19 +418,55 @@ IMPORTANT: Return relevance_score as a number between 0 and 100. Be selective -
         
         return classified
     
+    def _heuristic_drop(self, paper: Dict, reason: str) -> Dict:
+        """Mark a paper as dropped by the local pre-screen."""
+        paper.update({
+            'keep': False,
+            'relevance_score': 10,
+            'buckets': [],
+            'why_it_matters': f'heuristic:{reason}',
+            'summary': '',
+            'code_urls': [],
+            'dataset_urls': [],
+            'risk_flags': []
+        })
+        return paper
+    
+    def _semantic_text(self, paper: Dict) -> str:
+        """Text embedded for the semantic cache."""
+        return f"{paper.get('title', '')}\n{paper.get('abstract', '')[:self.max_abstract_chars]}"
+    
+    def _semantic_response(self, paper: Dict) -> str:
+        """Serialize a classified paper's evaluation for reuse by near-duplicates."""
+        # Links are paper-specific, so they are re-extracted from the matching paper instead
+        fields = [field for field in self.response_schema['properties'] if field not in ('code_urls', 'dataset_urls')]
+        return _json.dumps({field: paper[field] for field in fields if field in paper})
+    
     def _build_paper_prompt(self, paper: Dict) -> str:
         """Build prompt for a single paper."""
+        return self.PAPER_PROMPT_TEMPLATE.format_map(self._paper_fields(paper))
+    
+    def _build_multi_prompt(self, papers: List[Dict]) -> str:
+        """Build one prompt that lists several papers under numbered headers."""
+        parts = [self.MULTI_PROMPT_HEADER.format(count=len(papers))]
+        for index, paper in enumerate(papers, 1):
+            parts.append(f"### PAPER {index}\n" + self.PAPER_FIELDS_TEMPLATE.format_map(self._paper_fields(paper)))
+        return '\n\n'.join(parts)
+    
+    def _paper_fields(self, paper: Dict) -> Dict:
+        """Template values for one paper."""
         # Include detected buckets from heuristics as hints
         bucket_hints = paper.get('detected_buckets', [])
-        bucket_hint_str = f"\nHeuristic bucket hints: {', '.join(bucket_hints)}" if bucket_hints else ""
+        bucket_hint_str = ''.join(("\nHeuristic bucket hints: ", ', '.join(bucket_hints))) if bucket_hints else ""
         
-        return f"""{self.system_prompt}
-
-PAPER TO EVALUATE:
-Title: {paper['title']}
-Categories: {', '.join(paper.get('categories', []))}
-Abstract: {paper['abstract']}
-Comments: {paper.get('comments', 'None')}
-{bucket_hint_str}
-
-Provide your evaluation as JSON matching the schema."""
\ No newline at end of file
+        # Collapse whitespace and cap long fields so outliers don't inflate token counts
+        abstract = _WS.sub(' ', paper['abstract'] or '')[:self.max_abstract_chars]
+        comments = _WS.sub(' ', paper.get('comments', 'None') or '')[:self.max_comments_chars]
+        
+        return {
+            'title': paper['title'],
+            'categories': ', '.join(paper.get('categories', [])),
+            'abstract': abstract,
+            'comments': comments,
+            'bucket_hints': bucket_hint_str
+        }
@@ -0,0 +1,95 @@
+import google.generativeai as genai
+import logging
+import threading
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+
+from google.generativeai import caching
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = 'gemini-2.5-pro'
+
+_lock = threading.Lock()
+_configured_key: Optional[str] = None
+_models: Dict[Tuple[str, Optional[str]], genai.GenerativeModel] = {}
+_cached_contents: Dict[Tuple[str, str], caching.CachedContent] = {}
+
+
+def _configure(api_key: str):
+    """Configure the SDK for api_key, dropping models bound to another key. Call with _lock held."""
+    global _configured_key
+    
+    if api_key != _configured_key:
+        genai.configure(api_key=api_key)
+        _configured_key = api_key
+        _models.clear()
+        _cached_contents.clear()
+
+
+def get_model(api_key: str, system_instruction: Optional[str] = None, model_name: str = MODEL_NAME) -> genai.GenerativeModel:
+    """
+    Return a shared GenerativeModel, configuring the SDK only once per key.
+    
+    genai keeps one transport per process, so every model handed out here
+    reuses the same underlying connections; models are memoized on their
+    name and system instruction.
+    """
+    with _lock:
+        _configure(api_key)
+        
+        key = (model_name, system_instruction)
+        model = _models.get(key)
+        if model is None:
+            model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+            _models[key] = model
+        return model
+
+
+def get_cached_model(api_key: str, system_instruction: str, model_name: str = MODEL_NAME,
+                     ttl_seconds: int = 3600) -> genai.GenerativeModel:
+    """
+    Return a model whose system instruction lives in a Gemini context cache.
+    
+    The instruction is uploaded once per process and its TTL is refreshed on
+    every later call, so repeated requests only send the per-call prompt.
+    Falls back to a plain shared model when caching is unavailable, e.g. the
+    instruction is below the model's minimum cacheable size.
+    """
+    ttl = timedelta(seconds=ttl_seconds)
+    
+    with _lock:
+        _configure(api_key)
+        
+        key = (model_name, system_instruction)
+        cached = _cached_contents.get(key)
+        try:
+            if cached is None:
+                cached = caching.CachedContent.create(
+                    model=f'models/{model_name}',
+                    display_name='bio-digest-system',
+                    system_instruction=system_instruction,
+                    ttl=ttl
+                )
+                _cached_contents[key] = cached
+                logger.info(f"Created Gemini context cache {cached.name}")
+            else:
+                cached.update(ttl=ttl)
+            return genai.GenerativeModel.from_cached_content(cached)
+        except Exception as e:
+            logger.warning(f"Gemini context cache unavailable, sending system instruction inline: {e}")
+            _cached_contents.pop(key, None)
+    
+    return get_model(api_key, system_instruction=system_instruction, model_name=model_name)
+
+
+def model_from_config(api_key: str, system_instruction: str, config: dict) -> genai.GenerativeModel:
+    """Pick a context-cached or plain shared model based on the `llm` section of the app config."""
+    llm_config = (config or {}).get('llm', {})
+    if llm_config.get('context_cache_enabled', False):
+        return get_cached_model(
+            api_key,
+            system_instruction,
+            ttl_seconds=llm_config.get('context_cache_ttl_seconds', 3600)
+        )
+    return get_model(api_key, system_instruction=system_instruction)
@@ -0,0 +1,52 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Thread-safe limiter that paces calls to both a requests- and a tokens-per-minute budget."""
+
+    def __init__(self, rpm: float = 60, tpm: float = 1_000_000):
+        self.rpm = rpm
+        self.tpm = tpm
+        # Both buckets start full and refill continuously over a minute
+        self.request_tokens = float(rpm)
+        self.input_tokens = float(tpm)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0):
+        """Block until one request and `tokens` input tokens fit in the budget."""
+        # A single oversized request must still be allowed through eventually
+        tokens = min(tokens, self.tpm)
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self.updated_at
+                self.updated_at = now
+                self.request_tokens = min(self.rpm, self.request_tokens + elapsed * self.rpm / 60)
+                self.input_tokens = min(self.tpm, self.input_tokens + elapsed * self.tpm / 60)
+
+                if self.request_tokens >= 1 and self.input_tokens >= tokens:
+                    self.request_tokens -= 1
+                    self.input_tokens -= tokens
+                    return
+
+                wait = max(
+                    (1 - self.request_tokens) * 60 / self.rpm,
+                    (tokens - self.input_tokens) * 60 / self.tpm
+                )
+
+            logger.debug(f"Rate limiting Gemini call for {wait:.2f}s")
+            time.sleep(wait)
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'TokenBucket':
+        """Build a limiter from the `llm` section of the app config."""
+        llm_config = (config or {}).get('llm', {})
+        return cls(
+            rpm=llm_config.get('gemini_rpm', 60),
+            tpm=llm_config.get('gemini_tpm', 1_000_000)
+        )
@@ -0,0 +1,143 @@
+import google.generativeai as genai
+import logging
+import math
+import operator
+import os
+import sqlite3
+import struct
+import threading
+import time
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = 'models/text-embedding-004'
+EMBED_BATCH_SIZE = 100
+
+class SemanticCache:
+    """Reuse classifications across runs for papers whose abstracts embed close to one already seen."""
+
+    def __init__(self, path: str = ".cache/llm.sqlite", threshold: float = 0.93,
+                 ttl_hours: Optional[float] = None, enabled: bool = False,
+                 embedding_model: str = EMBEDDING_MODEL):
+        self.path = path
+        self.threshold = threshold
+        self.ttl_seconds = ttl_hours * 3600 if ttl_hours else None
+        self.enabled = enabled
+        self.embedding_model = embedding_model
+        self._lock = threading.Lock()
+        self._conn = None
+        # Unit-length vectors and their response text, loaded once per run
+        self._entries: List[Tuple[Tuple[float, ...], str]] = []
+
+        if self.enabled:
+            self._init_db()
+
+    def _init_db(self):
+        """Open the cache database and load stored embeddings, disabling the cache if that fails."""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS semantic_responses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    embedding BLOB,
+                    response_json TEXT,
+                    created_at INTEGER
+                )
+            """)
+            self._conn.commit()
+
+            cutoff = time.time() - self.ttl_seconds if self.ttl_seconds else 0
+            rows = self._conn.execute(
+                "SELECT embedding, response_json FROM semantic_responses WHERE created_at >= ?",
+                (cutoff,)
+            ).fetchall()
+            self._entries = [(self._unpack(blob), response_json) for blob, response_json in rows]
+            logger.debug(f"Loaded {len(self._entries)} semantic cache entries")
+        except sqlite3.Error as e:
+            logger.warning(f"Semantic cache disabled, could not open {self.path}: {e}")
+            self.enabled = False
+            self._conn = None
+
+    @staticmethod
+    def _pack(vector: Tuple[float, ...]) -> bytes:
+        """Serialize a vector as little-endian float16, half the size of float32."""
+        return struct.pack(f'<{len(vector)}e', *vector)
+
+    @staticmethod
+    def _unpack(blob: bytes) -> Tuple[float, ...]:
+        return struct.unpack(f'<{len(blob) // 2}e', blob)
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> Tuple[float, ...]:
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return tuple(x / norm for x in vector)
+
+    def embed(self, texts: List[str]) -> List[Tuple[float, ...]]:
+        """Embed texts in batched calls; returns unit vectors, or [] if embedding fails."""
+        vectors = []
+        try:
+            for start in range(0, len(texts), EMBED_BATCH_SIZE):
+                response = genai.embed_content(
+                    model=self.embedding_model,
+                    content=texts[start:start + EMBED_BATCH_SIZE],
+                    task_type='semantic_similarity'
+                )
+                vectors.extend(self._normalize(vector) for vector in response['embedding'])
+        except Exception as e:
+            logger.warning(f"Embedding failed, skipping semantic cache: {e}")
+            return []
+        return vectors
+
+    def lookup(self, vector: Tuple[float, ...]) -> Optional[str]:
+        """Return the response of the most similar stored paper if it clears the threshold."""
+        if not self.enabled:
+            return None
+
+        best_score, best_response = self.threshold, None
+        with self._lock:
+            for stored, response_json in self._entries:
+                # Both vectors are unit length, so the dot product is the cosine similarity
+                score = sum(map(operator.mul, vector, stored))
+                if score >= best_score:
+                    best_score, best_response = score, response_json
+        return best_response
+
+    def add(self, vector: Tuple[float, ...], response_json: str):
+        """Store a response under its paper's embedding."""
+        if not self.enabled:
+            return
+
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO semantic_responses (embedding, response_json, created_at) VALUES (?, ?, ?)",
+                    (self._pack(vector), response_json, int(time.time()))
+                )
+                self._conn.commit()
+                self._entries.append((vector, response_json))
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to write semantic cache entry: {e}")
+
+    def close(self):
+        """Close the underlying connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            self.enabled = False
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'SemanticCache':
+        """Build a semantic cache from the `llm` section of the app config."""
+        llm_config = (config or {}).get('llm', {})
+        return cls(
+            path=llm_config.get('cache_path', '.cache/llm.sqlite'),
+            threshold=llm_config.get('semantic_cache_threshold', 0.93),
+            ttl_hours=llm_config.get('cache_ttl_hours'),
+            enabled=llm_config.get('semantic_cache_enabled', False)
+        )
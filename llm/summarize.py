@@ -1,17 +1,74 @@
 import google.generativeai as genai
-import json
+import fastjsonschema
 import logging
 from typing import List, Dict
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from . import _json
+from .cache import LLMCache
+from .client import model_from_config
+
 logger = logging.getLogger(__name__)
 
+# Expected shape of the digest summary; every field is optional and defaulted below
+DIGEST_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "headline": {"type": "string"},
+        "bullets": {
+            "type": "array",
+            "items": {"type": "string"}
+        },
+        "highlights": {
+            "type": "array",
+            "items": {"type": "string"}
+        }
+    }
+}
+
+_validate_digest = fastjsonschema.compile(DIGEST_SCHEMA)
+_DIGEST_SCHEMA_JSON = _json.dumps(DIGEST_SCHEMA)
+
+# Upper bound on the serialized paper list sent in the prompt
+MAX_PAPERS_CHARS = 15000
+
+# Static role, focus and output format; sent as the model's system instruction
+SYSTEM_PROMPT = """You are a biomedical AI research analyst focused on neurotech, biotech startups, and clinical AI innovation.
+
+Create a concise digest summary of today's research papers for researchers and clinicians.
+
+Focus on:
+- Clinical breakthroughs and patient impact
+- Novel AI/ML methods for healthcare
+- Drug discovery and biotech innovations
+- Neuroscience and brain-computer interface advances
+- Any datasets or code releases that advance the field
+
+Output JSON with this structure:
+{
+    "headline": "One-line summary of today's key theme (max 100 chars)",
+    "bullets": [
+        "3-6 actionable bullet points about clinical impact, methods, or breakthroughs",
+        "Focus on what matters for biotech innovation and patient outcomes",
+        "Mention specific papers when relevant"
+    ],
+    "highlights": [
+        "0-3 specific callouts about notable results, datasets, or clinical applications"
+    ]
+}
+
+Be specific and clinically relevant. Highlight real-world impact on healthcare and biotech."""
+
 class DigestSummarizer:
     """Generate a digestible summary of today's papers."""
     
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-pro')
+    def __init__(self, api_key: str, config: dict = None, model: genai.GenerativeModel = None):
+        self.model = model or model_from_config(api_key, SYSTEM_PROMPT, config)
+        self.cache = LLMCache.from_config(config or {})
+        # Stream the (largest) digest response so receiving overlaps with buffering
+        llm_config = (config or {}).get('llm', {})
+        self.stream = llm_config.get('stream', True)
+        self.temperature = llm_config.get('temperature', 0)
     
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
     def generate_summary(self, papers: List[Dict]) -> Dict:
@@ -24,59 +81,66 @@ class DigestSummarizer:
                 'highlights': []
             }
         
-        # Prepare paper summaries for the prompt
+        # Serialize each paper compactly for the prompt, collecting the
+        # fallback stats (distinct buckets, top final score) in the same pass
         paper_summaries = []
+        bucket_set = set()
+        max_score = 0
         for p in papers:
-            paper_summaries.append({
+            buckets = p.get('buckets', [])
+            paper_summaries.append(_json.dumps({
                 'title': p.get('title', ''),
                 'score': p.get('final_score', p.get('relevance_score', 0)),
-                'buckets': p.get('buckets', []),
+                'buckets': buckets,
                 'why_matters': p.get('why_it_matters', ''),
                 'summary': p.get('summary', ''),
                 'has_code': bool(p.get('code_urls')),
                 'has_dataset': bool(p.get('dataset_urls'))
-            })
+            }))
+            bucket_set.update(buckets)
+            final_score = p.get('final_score', 0)
+            if final_score > max_score:
+                max_score = final_score
         
-        prompt = f"""You are a biomedical AI research analyst focused on neurotech, biotech startups, and clinical AI innovation.
+        # Papers arrive in score order, so when the list is too long the
+        # lowest-scored ones are left out (whole entries, keeping valid JSON)
+        included = []
+        size = 2
+        for summary in paper_summaries:
+            size += len(summary) + 1
+            if size > MAX_PAPERS_CHARS and included:
+                break
+            included.append(summary)
         
-Create a concise digest summary of today's research papers for researchers and clinicians.
-
-Focus on:
-- Clinical breakthroughs and patient impact
-- Novel AI/ML methods for healthcare
-- Drug discovery and biotech innovations
-- Neuroscience and brain-computer interface advances
-- Any datasets or code releases that advance the field
-
-Papers to summarize:
-{json.dumps(paper_summaries, indent=2)[:15000]}
-
-Output JSON with this structure:
-{{
-    "headline": "One-line summary of today's key theme (max 100 chars)",
-    "bullets": [
-        "3-6 actionable bullet points about clinical impact, methods, or breakthroughs",
-        "Focus on what matters for biotech innovation and patient outcomes",
-        "Mention specific papers when relevant"
-    ],
-    "highlights": [
-        "0-3 specific callouts about notable results, datasets, or clinical applications"
-    ]
-}}
-
-Be specific and clinically relevant. Highlight real-world impact on healthcare and biotech."""
+        prompt = f"""Papers to summarize:
+[{','.join(included)}]"""
         
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config={
-                    'response_mime_type': 'application/json',
-                    'temperature': 0.3,
-                    'top_p': 0.95
-                }
-            )
+            cache_key = self.cache.make_key(self.model.model_name, SYSTEM_PROMPT, prompt, _DIGEST_SCHEMA_JSON)
+            response_text = self.cache.get(cache_key)
             
-            result = json.loads(response.text)
+            if response_text is None:
+                response = self.model.generate_content(
+                    prompt,
+                    stream=self.stream,
+                    generation_config={
+                        'response_mime_type': 'application/json',
+                        'response_schema': DIGEST_SCHEMA,
+                        'temperature': self.temperature,
+                        'top_p': 0.95
+                    }
+                )
+                if self.stream:
+                    response_text = ''.join(chunk.text for chunk in response)
+                else:
+                    response_text = response.text
+                result = _json.loads(response_text)
+                _validate_digest(result)
+                self.cache.set(cache_key, response_text)
+            else:
+                logger.debug("LLM cache hit for digest summary")
+                result = _json.loads(response_text)
+                _validate_digest(result)
             
             # Validate structure
             if 'headline' not in result:
@@ -99,8 +163,8 @@ Be specific and clinically relevant. Highlight real-world impact on healthcare a
             return {
                 'headline': f"Today's digest: {len(papers)} papers on biomedical AI & healthcare",
                 'bullets': [
-                    f"Found {len(papers)} relevant papers across {len(set(b for p in papers for b in p.get('buckets', [])))} categories",
-                    f"Top paper scored {max(p.get('final_score', 0) for p in papers):.0f}/100"
+                    f"Found {len(papers)} relevant papers across {len(bucket_set)} categories",
+                    f"Top paper scored {max_score:.0f}/100"
                 ],
                 'highlights': []
             }
@@ -7,12 +7,16 @@ Updated to include figures, digest summary, X posts, and web view.
 import os
 import sys
 import logging
-import yaml
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Dict, Tuple
+from operator import itemgetter
+from typing import List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 import pytz
+import requests
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Import our modules
 from fetch import RSSFetcher, SearchAPIFetcher, PubMedFetcher, BioRxivFetcher
@@ -25,6 +29,7 @@ from social.x_finder import XFinder  # NEW
 from render.web_renderer import WebRenderer  # NEW
 from send import ResendClient
 from store import Database
+from config_loader import load as load_config
 
 # Load environment variables
 load_dotenv()
@@ -41,9 +46,8 @@ class DigestOrchestrator:
     """Main orchestrator for the digest pipeline."""
     
     def __init__(self, config_path: str = 'config.yaml'):
-        # Load configuration
-        with open(config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+        # Load configuration (parsed once per process, read-only)
+        self.config = load_config(config_path)
         
         # Initialize components
         self.db = Database(os.getenv('DATABASE_PATH', './digest.db'))
@@ -82,10 +86,18 @@ class DigestOrchestrator:
         )
         # NEW: Initialize new components
         self.summarizer = DigestSummarizer(
-            api_key=os.getenv('GEMINI_API_KEY')
+            api_key=os.getenv('GEMINI_API_KEY'),
+            config=self.config
         )
-        self.figure_extractor = FigureExtractor(self.config)
-        self.x_finder = XFinder(self.config)
+        # One pooled session for all enrichment requests, sized for enrich_workers
+        self.http = requests.Session()
+        self.http.mount('https://', HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=64,
+            max_retries=Retry(total=2, backoff_factor=0.3)
+        ))
+        self.figure_extractor = FigureExtractor(self.config, session=self.http)
+        self.x_finder = XFinder(self.config, session=self.http)
         
         self.renderer = EmailRenderer(self.config)
         self.web_renderer = WebRenderer(self.config)  # NEW
@@ -121,10 +133,8 @@ class DigestOrchestrator:
             
             # Step 2: Pre-filter with heuristics (add scores without aggressive filtering)
             logger.info("Adding heuristic scores to papers")
-            for paper in papers:
-                text = f"{paper['title']} {paper['abstract']}"
-                paper['heuristic_score'] = self.heuristic_filter._calculate_score(text)
-                paper['detected_buckets'] = self.heuristic_filter._detect_buckets(text)
+            for paper, (score, buckets) in zip(papers, self.heuristic_filter.scan_many(papers)):
+                paper['heuristic_score'], paper['detected_buckets'] = score, buckets
             
             # Step 3: Filter papers to only include today's papers
             papers = self._filter_todays_papers(papers)
@@ -141,27 +151,6 @@ class DigestOrchestrator:
                 logger.info("No new papers to process")
                 return
             
-            # NEW Step 5: Enrich papers with figures and X posts
-            logger.info("Enriching papers with figures and social media posts...")
-            enriched_papers = []
-            
-            for i, paper in enumerate(papers):
-                # Extract figures
-                if self.config.get('features', {}).get('include_figures', True):
-                    paper = self.figure_extractor.extract_figure(paper)
-                
-                # Find X posts (if enabled)
-                if self.config.get('features', {}).get('include_x_posts', False):
-                    paper = self.x_finder.find_x_post(paper)
-                
-                enriched_papers.append(paper)
-                
-                # Progress logging
-                if (i + 1) % 10 == 0:
-                    logger.info(f"Enriched {i + 1}/{len(papers)} papers")
-            
-            papers = enriched_papers
-            
             # Step 6: Classify with Gemini (or skip for debugging)
             if skip_classification:
                 logger.info("Skipping classification - marking all papers as relevant for debugging")
@@ -183,19 +172,14 @@ class DigestOrchestrator:
             
             # Step 5: Filter kept papers (must meet minimum relevance)
             min_relevance = self.config['digest'].get('min_relevance', 50)
-            kept_papers = [
-                p for p in papers 
-                if p.get('keep', False) and p.get('relevance_score', 0) >= min_relevance
-            ]
+            kept_papers, dropped_papers, low_score_papers = self._partition_papers(papers, min_relevance)
             logger.info(f"Kept {len(kept_papers)} papers after classification (min relevance: {min_relevance})")
             
             # Log classification summary
-            if papers:
+            if papers and logger.isEnabledFor(logging.INFO):
                 logger.info(f"\n{'='*80}")
                 logger.info("📊 CLASSIFICATION SUMMARY")
                 logger.info(f"{'='*80}")
-                dropped_papers = [p for p in papers if not p.get('keep', False)]
-                low_score_papers = [p for p in papers if p.get('keep', False) and p.get('relevance_score', 0) < min_relevance]
                 
                 logger.info(f"📈 Total papers processed: {len(papers)}")
                 logger.info(f"❌ Papers dropped by classifier: {len(dropped_papers)}")
@@ -203,22 +187,22 @@ class DigestOrchestrator:
                 logger.info(f"✅ Final papers in digest: {len(kept_papers)}")
                 
                 if dropped_papers:
-                    logger.info(f"\n📋 PAPERS DROPPED BY CLASSIFIER:")
+                    logger.debug("\n📋 PAPERS DROPPED BY CLASSIFIER:")
                     for p in dropped_papers[:5]:  # Show first 5
-                        logger.info(f"  ❌ {p['arxiv_id']}: {p['title'][:60]}...")
-                        logger.info(f"     Score: {p.get('relevance_score', 0)} | Reason: {p.get('why_it_matters', 'No reason given')[:100]}...")
+                        logger.debug("  ❌ %s: %s...", p['arxiv_id'], p['title'][:60])
+                        logger.debug("     Score: %s | Reason: %s...", p.get('relevance_score', 0), p.get('why_it_matters', 'No reason given')[:100])
                 
                 if low_score_papers:
-                    logger.info(f"\n⚠️  PAPERS BELOW MIN RELEVANCE ({min_relevance}):")
+                    logger.debug("\n⚠️  PAPERS BELOW MIN RELEVANCE (%s):", min_relevance)
                     for p in low_score_papers[:5]:  # Show first 5
-                        logger.info(f"  ⚠️  {p['arxiv_id']}: {p['title'][:60]}...")
-                        logger.info(f"     Score: {p.get('relevance_score', 0)} | Reason: {p.get('why_it_matters', 'No reason given')[:100]}...")
+                        logger.debug("  ⚠️  %s: %s...", p['arxiv_id'], p['title'][:60])
+                        logger.debug("     Score: %s | Reason: %s...", p.get('relevance_score', 0), p.get('why_it_matters', 'No reason given')[:100])
                 
                 if kept_papers:
-                    logger.info(f"\n✅ PAPERS KEPT FOR DIGEST:")
+                    logger.debug("\n✅ PAPERS KEPT FOR DIGEST:")
                     for p in kept_papers[:5]:  # Show first 5
-                        logger.info(f"  ✅ {p['arxiv_id']}: {p['title'][:60]}...")
-                        logger.info(f"     Score: {p.get('relevance_score', 0)} | Buckets: {', '.join(p.get('buckets', []))}")
+                        logger.debug("  ✅ %s: %s...", p['arxiv_id'], p['title'][:60])
+                        logger.debug("     Score: %s | Buckets: %s", p.get('relevance_score', 0), ', '.join(p.get('buckets', [])))
                 
                 logger.info(f"{'='*80}")
             
@@ -231,6 +215,7 @@ class DigestOrchestrator:
                     paper['keep'] = True
                     paper['relevance_score'] = paper.get('heuristic_score', 30)
                     paper['why_it_matters'] = 'Debug: kept based on heuristic score'
+                dropped_papers = [p for p in papers if not p.get('keep', False)]
             
             if not kept_papers:
                 logger.warning("No relevant papers found after classification")
@@ -240,6 +225,12 @@ class DigestOrchestrator:
                         logger.info(f"  - {paper['arxiv_id']}: {paper['title'][:60]}... (score: {paper.get('relevance_score', 0)})")
                 return
             
+            # NEW Step 5: Enrich kept papers with figures and X posts; this runs
+            # after classification so dropped papers never pay for the lookups,
+            # and before ranking since both add a small score boost
+            logger.info(f"Enriching {len(kept_papers)} kept papers with figures and social media posts...")
+            kept_papers = self._enrich_papers(kept_papers)
+            
             # Step 6: Rank and organize
             top_picks, buckets, also_noteworthy = self._organize_papers(kept_papers)
             
@@ -251,7 +242,7 @@ class DigestOrchestrator:
                 logger.info(f"Digest headline: {digest_summary.get('headline', 'N/A')}")
             
             # Step 10: Get filtered out papers for transparency
-            filtered_out = [p for p in papers if not p.get('keep', False)]
+            filtered_out = dropped_papers
             
             # NEW Step 11: Generate web view
             web_view_url = None
@@ -297,6 +288,7 @@ class DigestOrchestrator:
             )
             
             # Step 13: Send email (or save in test mode)
+            delivered = True
             if test_mode:
                 self._save_test_output(html)
                 logger.info("Test mode: Email saved to test_output.html")
@@ -306,7 +298,14 @@ class DigestOrchestrator:
                 subject = f"Bio Daily Research Digest - {datetime.now().strftime('%a, %b %d')}"
                 recipients = self.config['digest']['recipients']
                 
-                success = self.email_client.send_digest(
+                # Individual copies go out through Resend's batch endpoint,
+                # one request per 100 recipients
+                if self.config['digest'].get('send_individually', False):
+                    send = self.email_client.send_digest_batch
+                else:
+                    send = self.email_client.send_digest
+                
+                success = send(
                     recipients=recipients,
                     subject=subject,
                     html_content=html
@@ -316,6 +315,8 @@ class DigestOrchestrator:
                     logger.info(f"Email sent successfully to {recipients}")
                 else:
                     logger.error("Failed to send email")
+                    # Keep last run's feed validators so a rerun refetches the feeds
+                    delivered = False
             
             # Step 14: Save to database
             if not test_mode:
@@ -331,6 +332,10 @@ class DigestOrchestrator:
             # Log metrics
             self._log_metrics(papers, kept_papers, top_picks)
             
+            # Only a completed run marks the RSS feeds as seen
+            if delivered:
+                self._save_fetch_state()
+            
             logger.info("Digest pipeline completed successfully")
             
         except Exception as e:
@@ -351,68 +356,141 @@ class DigestOrchestrator:
         all_papers = []
         seen_ids = set()
         
-        for fetcher in self.fetchers:
-            fetcher_name = fetcher.__class__.__name__
-            logger.info(f"Fetching from {fetcher_name}...")
-            
-            try:
-                papers = fetcher.fetch()
-                logger.info(f"{fetcher_name} returned {len(papers)} papers")
-                
-                # Deduplicate across sources using DOI or ID
-                for paper in papers:
-                    # Create unique ID from available identifiers
-                    paper_id = (
-                        paper.get('doi') or 
-                        paper.get('arxiv_id') or 
-                        paper.get('pubmed_id') or 
-                        paper.get('biorxiv_id') or
-                        paper.get('title', '')
-                    )
-                    
-                    if paper_id and paper_id not in seen_ids:
-                        seen_ids.add(paper_id)
-                        # Standardize the ID field for database storage
-                        if not paper.get('arxiv_id'):
-                            paper['arxiv_id'] = paper_id
-                        all_papers.append(paper)
-                    else:
-                        logger.debug(f"Skipping duplicate: {paper.get('title', '')[:50]}")
+        if not self.fetchers:
+            logger.info("Total unique papers from all sources: 0")
+            return all_papers
+        
+        # Fetchers are I/O bound and independent, so run them concurrently;
+        # results are still merged in configured order so dedup is stable
+        with ThreadPoolExecutor(max_workers=len(self.fetchers)) as executor:
+            futures = [executor.submit(self._run_fetcher, fetcher) for fetcher in self.fetchers]
+            results = [future.result() for future in futures]
+        
+        for papers in results:
+            # Deduplicate across sources using DOI or ID
+            for paper in papers:
+                # Create unique ID from available identifiers
+                paper_id = (
+                    paper.get('doi') or 
+                    paper.get('arxiv_id') or 
+                    paper.get('pubmed_id') or 
+                    paper.get('biorxiv_id') or
+                    paper.get('title', '')
+                )
                 
-            except Exception as e:
-                logger.error(f"Error fetching from {fetcher_name}: {e}")
-                continue
+                if paper_id and paper_id not in seen_ids:
+                    seen_ids.add(paper_id)
+                    # Standardize the ID field for database storage
+                    if not paper.get('arxiv_id'):
+                        paper['arxiv_id'] = paper_id
+                    all_papers.append(paper)
+                else:
+                    logger.debug(f"Skipping duplicate: {paper.get('title', '')[:50]}")
         
         logger.info(f"Total unique papers from all sources: {len(all_papers)}")
         return all_papers
     
-    def _filter_todays_papers(self, papers: List[Dict]) -> List[Dict]:
+    def _save_fetch_state(self):
+        """Persist the RSS feed validators recorded during this run."""
+        for fetcher in self.fetchers:
+            if isinstance(fetcher, RSSFetcher):
+                fetcher.save_feed_validators()
+    
+    def _run_fetcher(self, fetcher) -> List[Dict]:
+        """Run a single fetcher, returning an empty list if it fails."""
+        fetcher_name = fetcher.__class__.__name__
+        logger.info(f"Fetching from {fetcher_name}...")
+        
+        try:
+            papers = fetcher.fetch()
+            logger.info(f"{fetcher_name} returned {len(papers)} papers")
+            return papers
+        except Exception as e:
+            logger.error(f"Error fetching from {fetcher_name}: {e}")
+            return []
+    
+    def _enrich_papers(self, papers: List[Dict]) -> List[Dict]:
+        """Enrich papers with figures and X posts concurrently, preserving order."""
+        features = self.config.get('features', {})
+        max_workers = features.get('enrich_workers', 12)
+        
+        # The figure and X lookups hit different hosts and each sets its own
+        # keys on the paper in place, so they run as independent tasks rather
+        # than one after the other per paper
+        lookups = []
+        if features.get('include_figures', True):
+            lookups.append(self.figure_extractor.extract_figure)
+        if features.get('include_x_posts', False):
+            lookups.append(self.x_finder.find_x_post)
+        
+        completed = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(lookup, paper): paper
+                for paper in papers
+                for lookup in lookups
+            }
+            
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.warning(f"Failed to enrich {futures[future].get('arxiv_id')}: {e}")
+                
+                # Progress logging (as_completed yields on this thread only)
+                completed += 1
+                if completed % 10 == 0:
+                    logger.info(f"Completed {completed}/{len(futures)} enrichment lookups")
+        
+        return papers
+    
+    @staticmethod
+    def _published_date_str(published) -> Optional[str]:
+        """
+        Return a paper's published date as 'YYYY-MM-DD', or None if unknown.
+        
+        RSS papers carry a datetime; PubMed and bioRxiv carry an ISO string,
+        or None when their date could not be parsed.
+        """
+        if isinstance(published, datetime):
+            return published.date().isoformat()
+        if isinstance(published, str):
+            return published[:10]
+        return None
+    
+    @classmethod
+    def _filter_todays_papers(cls, papers: List[Dict]) -> List[Dict]:
         """Filter papers to only include those from today."""
-        from datetime import datetime, timezone
+        from datetime import date, timezone
         
-        # Get today's date in UTC
-        today = datetime.now(timezone.utc).date()
+        # Get today's date in UTC, compared against each paper's 'YYYY-MM-DD'
+        today_str = datetime.now(timezone.utc).date().isoformat()
+        debug = logger.isEnabledFor(logging.DEBUG)
         
         todays_papers = []
         logger.info("=== Filtering to today's papers ===")
         
         for paper in papers:
-            # Parse the published date
+            paper_date_str = cls._published_date_str(paper.get('published'))
+            
+            if paper_date_str == today_str:
+                if debug:
+                    logger.debug("  ✅ TODAY: %s - %s", paper['arxiv_id'], paper['title'][:60])
+                todays_papers.append(paper)
+                continue
+            
             try:
-                published_date = datetime.fromisoformat(paper['published'].replace('Z', '+00:00'))
-                paper_date = published_date.date()
-                
-                title = paper['title'][:60] + "..." if len(paper['title']) > 60 else paper['title']
-                
-                if paper_date == today:
-                    logger.info(f"  ✅ TODAY: {paper['arxiv_id']} - {title}")
-                    todays_papers.append(paper)
-                else:
-                    logger.info(f"  ❌ OLD: {paper['arxiv_id']} ({paper_date}) - {title}")
-            except Exception as e:
+                if paper_date_str is None:
+                    raise ValueError(f"no published date ({paper.get('published')!r})")
+                date.fromisoformat(paper_date_str)
+            except ValueError as e:
                 logger.warning(f"Could not parse date for {paper['arxiv_id']}: {e}")
                 # Include papers with unparseable dates to be safe
                 todays_papers.append(paper)
+                continue
+            
+            if debug:
+                logger.debug("  ❌ OLD: %s (%s) - %s", paper['arxiv_id'], paper_date_str, paper['title'][:60])
         
         logger.info(f"=== Today's papers: {len(todays_papers)}/{len(papers)} papers from today ===")
         return todays_papers
@@ -423,21 +501,37 @@ class DigestOrchestrator:
         
         logger.info("=== Checking for duplicate papers ===")
         
+        # One batched lookup instead of a query per paper
+        seen = self.db.get_seen_set([(p['arxiv_id'], p.get('version', 1)) for p in papers])
+        
         for paper in papers:
             arxiv_id = paper['arxiv_id']
             version = paper.get('version', 1)
-            title = paper['title'][:60] + "..." if len(paper['title']) > 60 else paper['title']
             
-            if self.db.has_seen_paper(arxiv_id, version):
-                logger.info(f"  ❌ EXCLUDED (already processed): {arxiv_id} v{version} - {title}")
+            if (arxiv_id, version) in seen:
+                logger.debug("  ❌ EXCLUDED (already processed): %s v%s - %s", arxiv_id, version, paper['title'][:60])
             else:
-                logger.info(f"  ✅ INCLUDED (new paper): {arxiv_id} v{version} - {title}")
+                logger.debug("  ✅ INCLUDED (new paper): %s v%s - %s", arxiv_id, version, paper['title'][:60])
                 new_papers.append(paper)
         
         logger.info(f"=== Deduplication complete: {len(new_papers)}/{len(papers)} papers are new ===")
         
         return new_papers
     
+    def _partition_papers(self, papers: List[Dict], min_relevance: float) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+        """Split classified papers into kept, dropped and kept-but-below-min_relevance in one pass."""
+        kept, dropped, low_score = [], [], []
+        
+        for paper in papers:
+            if not paper.get('keep', False):
+                dropped.append(paper)
+            elif paper.get('relevance_score', 0) >= min_relevance:
+                kept.append(paper)
+            else:
+                low_score.append(paper)
+        
+        return kept, dropped, low_score
+    
     def _organize_papers(self, papers: List[Dict]) -> Tuple[List[Dict], Dict[str, List[Dict]], List[Dict]]:
         """Organize papers into top picks, buckets, and also noteworthy."""
         
@@ -445,8 +539,9 @@ class DigestOrchestrator:
         for paper in papers:
             paper['final_score'] = self._calculate_final_score(paper)
         
-        # Sort by final score
-        papers.sort(key=lambda p: p['final_score'], reverse=True)
+        # Sort by final score (stable, so every slice and filter below is
+        # already in score order)
+        papers.sort(key=itemgetter('final_score'), reverse=True)
         
         # Select top picks
         top_picks_count = self.config['digest']['top_picks']
@@ -456,30 +551,24 @@ class DigestOrchestrator:
         for paper in top_picks:
             paper['in_top_picks'] = True
         
-        # Organize remaining papers by bucket (avoid duplicates)
+        # Organize remaining papers in one pass: each paper goes to the first
+        # configured bucket it matches, otherwise to also noteworthy if its
+        # score is high enough
         remaining = papers[top_picks_count:]
-        buckets = {}
-        used_papers = set()  # Track papers already assigned to buckets
-        
-        for bucket_config in self.config['buckets']:
-            bucket_name = bucket_config['name']
-            bucket_papers = [
-                p for p in remaining 
-                if bucket_name in p.get('buckets', []) and p['arxiv_id'] not in used_papers
-            ]
-            
-            if bucket_papers:
-                # Sort within bucket by score
-                bucket_papers.sort(key=lambda p: p['final_score'], reverse=True)
-                buckets[bucket_name] = bucket_papers
-                # Mark these papers as used
-                used_papers.update(p['arxiv_id'] for p in bucket_papers)
-        
-        # Find also noteworthy (high score but not in top picks or main buckets)
-        also_noteworthy = [
-            p for p in remaining
-            if p['final_score'] >= 60 and p['arxiv_id'] not in used_papers
-        ]
+        bucket_names = [bucket_config['name'] for bucket_config in self.config['buckets']]
+        bucket_order = {name: i for i, name in enumerate(bucket_names)}
+        bucket_lists = {name: [] for name in bucket_names}
+        also_noteworthy = []
+        
+        for paper in remaining:
+            matched = [bucket_order[name] for name in paper.get('buckets', []) if name in bucket_order]
+            if matched:
+                bucket_lists[bucket_names[min(matched)]].append(paper)
+            elif paper['final_score'] >= 60:
+                also_noteworthy.append(paper)
+        
+        # Lists are already in score order, as filled from the sorted papers
+        buckets = {name: bucket_papers for name, bucket_papers in bucket_lists.items() if bucket_papers}
         
         return top_picks, buckets, also_noteworthy
     
@@ -558,8 +647,7 @@ class DigestOrchestrator:
     
     def _save_test_output(self, html: str):
         """Save test output to file."""
-        with open('test_output.html', 'w') as f:
-            f.write(html)
+        Path('test_output.html').write_bytes(html.encode('utf-8'))
     
     def _log_metrics(self, papers: List[Dict], kept_papers: List[Dict], top_picks: List[Dict]):
         """Log metrics for monitoring."""
@@ -582,13 +670,15 @@ class DigestOrchestrator:
         if not self.db:
             return
             
-        self.db.log_metric('papers_fetched', len(papers))
-        self.db.log_metric('papers_kept', len(kept_papers))
-        self.db.log_metric('keep_ratio', len(kept_papers) / len(papers) if papers else 0)
-        self.db.log_metric('top_picks', len(top_picks))
-        
-        for bucket, count in bucket_counts.items():
-            self.db.log_metric(f'bucket_{bucket}', count)
+        # Written together in one transaction
+        metrics = [
+            ('papers_fetched', len(papers), None),
+            ('papers_kept', len(kept_papers), None),
+            ('keep_ratio', len(kept_papers) / len(papers) if papers else 0, None),
+            ('top_picks', len(top_picks), None),
+        ]
+        metrics.extend((f'bucket_{bucket}', count, None) for bucket, count in bucket_counts.items())
+        self.db.log_metrics(metrics)
 
 
 if __name__ == '__main__':
@@ -602,7 +692,7 @@ if __name__ == '__main__':
     
     # Set logging level based on verbose flag
     if verbose:
-        logging.getLogger().setLevel(logging.INFO)
+        logging.getLogger().setLevel(logging.DEBUG)
         logger.info("Verbose logging enabled - showing detailed classification reasoning")
     
     if skip_classification:
@@ -617,8 +707,14 @@ if __name__ == '__main__':
     # Reset database if requested
     if reset_db:
         if os.path.exists('./digest.db'):
+            # Close first so SQLite checkpoints and removes its WAL files
+            orchestrator.db.close()
             os.remove('./digest.db')
             logger.info("Database reset - removed digest.db")
             orchestrator.db = Database(os.getenv('DATABASE_PATH', './digest.db'))
     
-    orchestrator.run(test_mode=test_mode, skip_classification=skip_classification, force=force_process)
\ No newline at end of file
+    try:
+        orchestrator.run(test_mode=test_mode, skip_classification=skip_classification, force=force_process)
+    finally:
+        orchestrator.x_finder.close()
+        orchestrator.db.close()
\ No newline at end of file
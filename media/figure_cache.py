@@ -0,0 +1,11 @@
+from store import IdCache
+
+class FigureCache(IdCache):
+    """Extracted figure URL per arXiv id, so repeat runs skip the page fetches."""
+
+    TABLE = 'figures'
+    COLUMN = 'figure_url'
+    LABEL = 'Figure'
+    # "No figure" is cached for less time, since HTML versions appear after submission
+    CONFIG_SECTION = 'media'
+    CONFIG_PREFIX = 'figure_cache'
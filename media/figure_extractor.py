@@ -1,19 +1,33 @@
 import re
-import os
 import logging
 import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from lxml import etree as ET
+from urllib.parse import urljoin, urlparse
 from typing import Dict, Optional
 
+from limiters import DomainLimiter
+from .figure_cache import FigureCache
+
+# Bytes read per chunk while streaming figure pages
+STREAM_CHUNK_SIZE = 64 * 1024
+
 logger = logging.getLogger(__name__)
 
 class FigureExtractor:
     """Extract key figures from arXiv papers using HTML versions."""
     
-    def __init__(self, config: dict):
+    # Image links among a paper's ancillary files
+    IMAGE_HREF_PATTERN = re.compile(r'\.(png|jpg|jpeg|gif)$', re.IGNORECASE)
+    
+    def __init__(self, config: dict, session: Optional[requests.Session] = None):
         self.config = config
         self.prefer_ar5iv = config.get('media', {}).get('prefer_ar5iv', True)
+        # Shared with the other enrichment steps when provided, so connections are reused
+        self.session = session or requests.Session()
+        # ar5iv and arxiv.org throttle bursts, so concurrent probes are paced per host
+        self.cache = FigureCache.from_config(config)
+        self.limiter = DomainLimiter(config.get('media', {}).get('min_request_interval_ms', 200) / 1000)
         self.headers = {
             'User-Agent': 'MindCoDigestBot/1.0 (+https://github.com/aryanj916/bio_digest)'
         }
@@ -25,6 +39,24 @@ class FigureExtractor:
         if not arxiv_id:
             return paper
         
+        # Reuse the result of an earlier run before touching the network
+        hit, figure_url = self.cache.get(arxiv_id)
+        if not hit:
+            figure_url = self._find_figure(arxiv_id)
+            self.cache.set(arxiv_id, figure_url)
+        
+        if figure_url:
+            paper['figure_url'] = figure_url
+            logger.info(f"Found figure for {arxiv_id}: {figure_url}")
+        else:
+            # Mark for PDF preview generation
+            paper['needs_pdf_preview'] = True
+            logger.debug(f"No figure found for {arxiv_id}, will generate PDF preview")
+        
+        return paper
+    
+    def _find_figure(self, arxiv_id: str) -> Optional[str]:
+        """Probe the HTML sources in order of preference for a figure URL."""
         figure_url = None
         
         # Try different sources in order of preference
@@ -45,42 +77,51 @@ class FigureExtractor:
         if not figure_url:
             figure_url = self._extract_from_abstract_page(arxiv_id)
         
-        if figure_url:
-            paper['figure_url'] = figure_url
-            logger.info(f"Found figure for {arxiv_id}: {figure_url}")
-        else:
-            # Mark for PDF preview generation
-            paper['needs_pdf_preview'] = True
-            logger.debug(f"No figure found for {arxiv_id}, will generate PDF preview")
-        
-        return paper
+        return figure_url
+    
+    def _get(self, url: str, stream: bool = False) -> requests.Response:
+        """GET a page once its host's rate limit allows."""
+        self.limiter.wait(urlparse(url).netloc)
+        return self.session.get(url, headers=self.headers, timeout=10, stream=stream)
+    
+    @staticmethod
+    def _iter_events(response: requests.Response, tags: tuple):
+        """
+        Incrementally parse a streamed HTML response, yielding (event, element)
+        for starts and ends of the given tags in document order. Callers stop
+        iterating once they have an answer, so the rest of the page is never
+        downloaded or parsed.
+        """
+        parser = ET.HTMLPullParser(events=('start', 'end'), tag=tags)
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            parser.feed(chunk)
+            yield from parser.read_events()
+        parser.close()
+        yield from parser.read_events()
     
     def _extract_from_ar5iv(self, arxiv_id: str) -> Optional[str]:
         """Extract figure from ar5iv HTML version."""
         url = f"https://ar5iv.org/html/{arxiv_id}"
         base_url = url if url.endswith('/') else url + '/'
         
+        def is_large(img) -> bool:
+            # Filter out small icons and math symbols
+            if 'ltx_graphics' in (img.get('class') or '').split():
+                return True
+            width = self._pixels(img.get('width'))
+            return width is not None and width > 200
+        
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            if response.status_code != 200:
-                return None
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Look for first meaningful figure
-            figure = soup.find('figure', class_='ltx_figure')
-            if figure:
-                img = figure.find('img')
-                if img and img.get('src'):
-                    return urljoin(base_url, img['src'])
-            
-            # Alternative: look for first large image
-            for img in soup.find_all('img'):
-                src = img.get('src', '')
-                # Filter out small icons and math symbols
-                if 'ltx_graphics' in img.get('class', []) or \
-                   (img.get('width') and int(img.get('width', 0)) > 200):
-                    return urljoin(base_url, src)
+            with self._get(url, stream=True) as response:
+                if response.status_code != 200:
+                    return None
+                
+                # Look for first meaningful figure, else the first large image
+                return self._scan_figure_page(
+                    response, base_url,
+                    is_figure=lambda elem: 'ltx_figure' in (elem.get('class') or '').split(),
+                    is_large=is_large
+                )
             
         except Exception as e:
             logger.debug(f"Failed to extract from ar5iv for {arxiv_id}: {e}")
@@ -92,56 +133,80 @@ class FigureExtractor:
         url = f"https://arxiv.org/html/{arxiv_id}"
         base_url = url if url.endswith('/') else url + '/'
         
+        def is_large(img) -> bool:
+            # Check if it's a meaningful image
+            width = self._pixels(img.get('width'))
+            height = self._pixels(img.get('height'))
+            return width is not None and height is not None and max(width, height) >= 300
+        
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            if response.status_code != 200:
-                return None
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Look for figures
-            figure = soup.find('figure')
-            if figure:
-                img = figure.find('img')
-                if img and img.get('src'):
-                    return urljoin(base_url, img['src'])
-            
-            # Look for any reasonably sized image
-            for img in soup.find_all('img'):
-                # Check if it's a meaningful image
-                width = img.get('width')
-                height = img.get('height')
-                if width and height:
-                    try:
-                        w = int(width)
-                        h = int(height)
-                        if max(w, h) >= 300:
-                            return urljoin(base_url, img.get('src'))
-                    except:
-                        pass
+            with self._get(url, stream=True) as response:
+                if response.status_code != 200:
+                    return None
+                
+                # Look for figures, else any reasonably sized image
+                return self._scan_figure_page(response, base_url, is_figure=lambda elem: True, is_large=is_large)
             
         except Exception as e:
             logger.debug(f"Failed to extract from arXiv HTML for {arxiv_id}: {e}")
         
         return None
     
+    @staticmethod
+    def _pixels(value: Optional[str]) -> Optional[int]:
+        """Parse a width/height attribute holding a plain integer, else None."""
+        if value is None:
+            return None
+        value = value.strip()
+        return int(value) if value.isdecimal() else None
+    
+    def _scan_figure_page(self, response: requests.Response, base_url: str, is_figure, is_large) -> Optional[str]:
+        """
+        Return the image of the first figure matching is_figure if it has one,
+        otherwise the first image in the page matching is_large.
+        """
+        first_figure = None
+        figure_settled = False
+        fallback = None  # URL of the first large image, once seen
+        
+        for event, elem in self._iter_events(response, ('figure', 'img')):
+            if elem.tag == 'figure':
+                if event == 'start':
+                    if first_figure is None and is_figure(elem):
+                        first_figure = elem
+                elif elem is first_figure:
+                    img = next(elem.iter('img'), None)
+                    if img is not None and img.get('src'):
+                        return urljoin(base_url, img.get('src'))
+                    figure_settled = True
+                    # The first large image decides; stop if it is already known
+                    if fallback is not None:
+                        break
+            elif event == 'start' and fallback is None and is_large(elem):
+                fallback = urljoin(base_url, elem.get('src', ''))
+                # Once the first figure is settled nothing later can change the answer
+                if figure_settled:
+                    break
+        
+        return fallback
+    
     def _extract_from_abstract_page(self, arxiv_id: str) -> Optional[str]:
         """Try to find ancillary files or linked images from abstract page."""
         url = f"https://arxiv.org/abs/{arxiv_id}"
         
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self._get(url)
             if response.status_code != 200:
                 return None
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = BeautifulSoup(response.content, 'lxml')
             
             # Look for ancillary files section
             ancillary = soup.find('div', class_='ancillary')
             if ancillary:
                 for link in ancillary.find_all('a'):
                     href = link.get('href', '')
-                    if re.search(r'\.(png|jpg|jpeg|gif)$', href, re.IGNORECASE):
+                    if self.IMAGE_HREF_PATTERN.search(href):
                         return urljoin(url, href)
             
         except Exception as e:
@@ -0,0 +1,62 @@
+import logging
+import os
+from functools import lru_cache
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = os.path.dirname(__file__)
+
+# Compiled template bytecode, reused across runs until the template changes.
+# Follows XDG_CACHE_HOME so CI runners can persist it with their other caches.
+BYTECODE_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'bio_digest', 'jinja'
+)
+
+
+def clip_summary(text: str, limit: int) -> str:
+    """
+    Cut text to at most `limit` characters, ending on a sentence near the
+    limit when there is one, else on a word followed by a period.
+    """
+    clipped = text[:limit]
+    if len(text) <= limit:
+        return clipped
+    last_period = clipped.rfind('.')
+    if last_period > limit - 100:
+        return clipped[:last_period + 1]
+    last_space = clipped.rfind(' ')
+    if last_space > limit - 50:
+        return clipped[:last_space] + '.'
+    return clipped
+
+
+@lru_cache(maxsize=None)
+def get_environment() -> Environment:
+    """Return the Jinja environment shared by all renderers."""
+    try:
+        os.makedirs(BYTECODE_CACHE_DIR, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(BYTECODE_CACHE_DIR)
+    except OSError as e:
+        logger.warning(f"Jinja bytecode cache disabled: {e}")
+        bytecode_cache = None
+
+    # Same options as a bare Template() so rendered output is unchanged.
+    # Templates ship with the package and do not change while the process
+    # runs, so skip the per-lookup mtime check.
+    environment = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        bytecode_cache=bytecode_cache,
+        auto_reload=False,
+        cache_size=400
+    )
+    # Plain Python filters for logic that is slow to express in template code
+    environment.filters['clip_summary'] = clip_summary
+    return environment
+
+
+def get_template(name: str) -> Template:
+    """Load a template from this package; the environment caches compiled templates."""
+    return get_environment().get_template(name)
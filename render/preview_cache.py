@@ -0,0 +1,15 @@
+from store import IdCache
+
+class PreviewCache(IdCache):
+    """
+    Outcome of PDF preview attempts per arXiv id: the preview path on success,
+    None on failure. Successes are kept; failures are retried after the miss
+    TTL, since the PDF may have been temporarily unavailable.
+    """
+
+    TABLE = 'preview_paths'
+    COLUMN = 'preview_path'
+    LABEL = 'Preview'
+    CONFIG_SECTION = 'media'
+    CONFIG_PREFIX = 'preview_cache'
+    DEFAULT_TTL_HOURS = None
@@ -1,8 +1,10 @@
 from jinja2 import Template
 import logging
 from datetime import datetime
+from functools import lru_cache
 from typing import List, Dict, Optional
-import os
+
+from ._templates import get_template
 
 logger = logging.getLogger(__name__)
 
@@ -34,8 +36,12 @@ class EmailRenderer:
             "shadow": "0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06)",
             "fontStack": "'Segoe UI', Roboto, Arial, sans-serif",
         }
+        # Bucket styles depend only on the tokens, so build them once
+        self._badge_style_map = self._build_badge_style_map()
 
-    def _hex_to_rgba(self, hex_color: str, alpha: float) -> str:
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _hex_to_rgba(hex_color: str, alpha: float) -> str:
         """Convert hex like #RRGGBB to rgba(r,g,b,alpha)."""
         hex_color = hex_color.lstrip('#')
         r = int(hex_color[0:2], 16)
@@ -88,15 +94,7 @@ class EmailRenderer:
     
     def _load_template(self) -> Template:
         """Load the email template."""
-        template_path = os.path.join(
-            os.path.dirname(__file__), 
-            'email_template.html'
-        )
-        
-        with open(template_path, 'r') as f:
-            template_str = f.read()
-        
-        return Template(template_str)
+        return get_template('email_template.html')
     
     def render(self, 
                top_picks: List[Dict],
@@ -137,7 +135,7 @@ class EmailRenderer:
             'hours_lookback': self.config['digest']['fetch'].get('hours_lookback', 24),
             'categories_str': categories_str,
             'tokens': self.tokens,
-            'badge_style_by_bucket': self._build_badge_style_map(),
+            'badge_style_by_bucket': self._badge_style_map,
             'from_email': self.config['digest'].get('from_email', ''),
             'digest_summary': digest_summary,  # NEW
             'web_view_url': web_view_url,      # NEW
@@ -146,13 +144,15 @@ class EmailRenderer:
         
         html = self.template.render(**context)
         
-        # Log statistics
-        total_papers = len(top_picks) + sum(len(p) for p in buckets.values()) + len(also_noteworthy)
-        papers_with_figures = sum(1 for p in top_picks if p.get('figure_url'))
-        papers_with_x = sum(1 for p in top_picks if p.get('x_url'))
+        # Log statistics, counting figures and X posts in one pass over the top picks
+        bucketed_papers = sum(map(len, buckets.values()))
+        papers_with_figures = papers_with_x = 0
+        for p in top_picks:
+            papers_with_figures += bool(p.get('figure_url'))
+            papers_with_x += bool(p.get('x_url'))
         
         logger.info(f"Rendered email with {len(top_picks)} top picks, "
-                   f"{sum(len(p) for p in buckets.values())} bucketed papers")
+                   f"{bucketed_papers} bucketed papers")
         logger.info(f"Papers with figures: {papers_with_figures}")
         logger.info(f"Papers with X posts: {papers_with_x}")
         
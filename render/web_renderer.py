@@ -1,12 +1,24 @@
-import os
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from jinja2 import Template
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import IO, List, Dict, Optional
 from pathlib import Path
 
+from ._templates import get_template
+from .preview_cache import PreviewCache
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # fall back to pdf2image/Poppler
+    fitz = None
+
 logger = logging.getLogger(__name__)
 
+PREVIEW_DPI = 150
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
 class WebRenderer:
     """Render interactive web view with collapsible categories."""
     
@@ -19,18 +31,56 @@ class WebRenderer:
         self.assets_dir = self.web_dir / 'assets'
         self.web_dir.mkdir(exist_ok=True)
         self.assets_dir.mkdir(exist_ok=True)
+        
+        # Outcome of earlier preview attempts, so failures are not retried every run
+        self.preview_cache = PreviewCache.from_config(config)
     
     def _load_template(self) -> Template:
         """Load the web template."""
-        template_path = os.path.join(
-            os.path.dirname(__file__), 
-            'web_template.html'
+        return get_template('web_template.html')
+    
+    def _download_pdf(self, pdf_url: str, pdf_path: Path):
+        """Download a paper's PDF unless it is already on disk."""
+        if pdf_path.exists():
+            return
+        
+        import requests
+        # Stream to a temporary file so a failed download never leaves a
+        # truncated PDF behind for the exists() check above
+        partial_path = pdf_path.with_suffix('.pdf.part')
+        with requests.get(pdf_url, timeout=30, stream=True) as response:
+            response.raise_for_status()
+            with open(partial_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+        partial_path.replace(pdf_path)
+    
+    def _render_first_page(self, pdf_path: Path, preview_path: Path) -> bool:
+        """Render the first page of a PDF to PNG; returns True if an image was written."""
+        if fitz is not None:
+            # Render in-process straight to PNG, no pdftoppm subprocess
+            with fitz.open(pdf_path) as doc:
+                if doc.page_count == 0:
+                    return False
+                zoom = PREVIEW_DPI / 72
+                pixmap = doc.load_page(0).get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+                pixmap.save(str(preview_path))
+            return True
+        
+        from pdf2image import convert_from_path
+        
+        # Convert first page to image
+        images = convert_from_path(
+            pdf_path, 
+            first_page=1, 
+            last_page=1,
+            dpi=PREVIEW_DPI
         )
         
-        with open(template_path, 'r') as f:
-            template_str = f.read()
-        
-        return Template(template_str)
+        if not images:
+            return False
+        images[0].save(preview_path, 'PNG')
+        return True
     
     def _generate_pdf_preview(self, paper: Dict) -> Dict:
         """Generate PDF preview for papers without figures."""
@@ -38,70 +88,83 @@ class WebRenderer:
         if not paper.get('needs_pdf_preview'):
             return paper
         
+        arxiv_id = None
         try:
-            from pdf2image import convert_from_path
-            
             arxiv_id = paper['arxiv_id'].split('v')[0]
             preview_path = self.assets_dir / f"{arxiv_id}.png"
             
+            # Skip papers whose preview failed recently
+            cached, cached_path = self.preview_cache.get(arxiv_id)
+            if cached and cached_path is None:
+                logger.debug("Skipping PDF preview for %s: failed on a recent run", arxiv_id)
+                return paper
+            
             # Check if preview already exists
             if not preview_path.exists():
                 pdf_url = paper.get('pdf_link')
                 if pdf_url:
                     # Download PDF first
-                    import requests
                     pdf_path = self.assets_dir / f"{arxiv_id}.pdf"
+                    self._download_pdf(pdf_url, pdf_path)
                     
-                    if not pdf_path.exists():
-                        response = requests.get(pdf_url, timeout=30)
-                        with open(pdf_path, 'wb') as f:
-                            f.write(response.content)
-                    
-                    # Convert first page to image
-                    images = convert_from_path(
-                        pdf_path, 
-                        first_page=1, 
-                        last_page=1,
-                        dpi=150
-                    )
-                    
-                    if images:
-                        images[0].save(preview_path, 'PNG')
+                    if self._render_first_page(pdf_path, preview_path):
                         logger.info(f"Generated PDF preview for {arxiv_id}")
                         
                         # Clean up PDF to save space
                         pdf_path.unlink()
+                    else:
+                        self.preview_cache.set(arxiv_id, None)
             
             if preview_path.exists():
                 paper['pdf_preview_url'] = f"assets/{arxiv_id}.png"
                 paper['needs_pdf_preview'] = False
+                if not cached:
+                    self.preview_cache.set(arxiv_id, str(preview_path))
         
         except Exception as e:
             logger.error(f"Failed to generate PDF preview for {paper.get('arxiv_id')}: {e}")
+            if arxiv_id:
+                self.preview_cache.set(arxiv_id, None)
         
         return paper
     
+    def _generate_pdf_previews(self, papers: List[Dict]):
+        """
+        Generate previews for all papers that need one, concurrently. PyMuPDF
+        releases the GIL while rendering and Poppler runs in a pdftoppm
+        subprocess, so threads overlap both the downloads and the rendering.
+        """
+        # A paper dict listed in several sections is only processed once
+        pending = list({id(p): p for p in papers if p.get('needs_pdf_preview')}.values())
+        if not pending:
+            return
+        
+        max_workers = self.config.get('media', {}).get('pdf_preview_workers', os.cpu_count() or 4)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as executor:
+            # _generate_pdf_preview logs and swallows its own errors
+            list(executor.map(self._generate_pdf_preview, pending))
+    
     def render(self, 
                top_picks: List[Dict],
                buckets: Dict[str, List[Dict]],
                also_noteworthy: List[Dict],
                digest_summary: Optional[Dict] = None,
-               metadata: Optional[Dict] = None) -> str:
-        """Render the interactive web view."""
+               metadata: Optional[Dict] = None,
+               out: Optional[IO[str]] = None) -> Optional[str]:
+        """
+        Render the interactive web view and return the HTML, or, when `out` is
+        given, stream it into that text file object and return None.
+        """
         
         # Generate PDF previews for papers that need them
         if self.config.get('media', {}).get('generate_pdf_previews', True):
             logger.info("Generating PDF previews for papers without figures...")
             
-            for paper in top_picks:
-                self._generate_pdf_preview(paper)
-            
+            papers = list(top_picks)
             for bucket_papers in buckets.values():
-                for paper in bucket_papers:
-                    self._generate_pdf_preview(paper)
-            
-            for paper in also_noteworthy:
-                self._generate_pdf_preview(paper)
+                papers.extend(bucket_papers)
+            papers.extend(also_noteworthy)
+            self._generate_pdf_previews(papers)
         
         # Format the date
         date_formatted = datetime.now().strftime("%A, %B %d, %Y")
@@ -130,19 +193,29 @@ class WebRenderer:
             'total_papers': metadata.get('total_papers', 0) if metadata else 0
         }
         
-        html = self.template.render(**context)
+        if out is not None:
+            # Written in small buffered chunks, never holding the whole page
+            self.template.stream(**context).dump(out)
+            html = None
+        else:
+            html = self.template.render(**context)
         
         logger.info(f"Rendered web view with {len(top_picks)} top picks, "
-                   f"{sum(len(p) for p in buckets.values())} bucketed papers")
+                   f"{sum(map(len, buckets.values()))} bucketed papers")
         
         return html
     
+    @property
+    def output_path(self) -> Path:
+        """Where save() writes the web view."""
+        return self.web_dir / 'index.html'
+    
     def save(self, html: str) -> str:
         """Save the web view and return the path."""
-        output_path = self.web_dir / 'index.html'
+        output_path = self.output_path
         
-        with open(output_path, 'w') as f:
-            f.write(html)
+        # One write of the whole page, independent of the locale's default encoding
+        output_path.write_text(html, encoding='utf-8')
         
         logger.info(f"Saved web view to {output_path}")
         
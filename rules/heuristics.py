@@ -1,6 +1,7 @@
 import re
 import logging
-from typing import List, Dict, Set, Tuple
+from bisect import bisect_right
+from typing import List, Dict, Optional, Set, Tuple
 import yaml
 
 logger = logging.getLogger(__name__)
@@ -8,6 +9,30 @@ logger = logging.getLogger(__name__)
 class HeuristicFilter:
     """Fast heuristic filtering and scoring for papers."""
     
+    # Any of these marks a paper as having an AI/ML component
+    AI_TERMS = [
+        "AI", "artificial intelligence", "machine learning", "deep learning", "neural network",
+        "transformer", "large language model", "LLM", "foundation model", "generative model",
+        "diffusion model", "reinforcement learning", "computer vision", "natural language processing"
+    ]
+    
+    # Lowercase substrings that together earn the biomedical AI base score
+    BASE_AI_TERMS = ('machine learning', 'deep learning', 'neural network', 'ai')
+    BASE_DOMAIN_TERMS = ('medical', 'clinical', 'patient', 'drug', 'protein', 'diagnostic', 'healthcare')
+    
+    # GitHub, GitLab and project pages, as one alternation so the text is scanned once
+    CODE_URL_PATTERN = re.compile(
+        r'(https?://(?:github\.com|gitlab\.com)/[\w\-/]+|https?://[\w\-\.]+\.github\.io/[\w\-/]+)'
+    )
+    
+    # Common dataset hosts
+    DATASET_URL_PATTERN = re.compile(
+        r'(https?://[\w\-\.]*(?:huggingface\.co/datasets|kaggle\.com|zenodo\.org)/[\w\-/]+)'
+    )
+    
+    # Points per boost term match, by level
+    LEVEL_WEIGHTS = (('high', 20), ('medium', 10), ('low', 5))
+    
     def __init__(self, config: dict):
         self.config = config
         self.boost_terms = config['digest']['boost_terms']
@@ -19,155 +44,172 @@ class HeuristicFilter:
         # Compile regex patterns for efficiency
         self._compile_patterns()
     
+    @staticmethod
+    def _alternation(terms: List[str]) -> Optional[re.Pattern]:
+        """
+        Compile lowercased terms into one word-bounded alternation, or None
+        when there are no terms. Patterns are matched against lowercased text
+        instead of using re.IGNORECASE. Longest terms go first, so where two
+        terms overlap the longer one is matched.
+        """
+        if not terms:
+            return None
+        lowered = sorted((term.lower() for term in terms), key=len, reverse=True)
+        return re.compile(r'\b(?:' + '|'.join(map(re.escape, lowered)) + r')\b')
+    
     def _compile_patterns(self):
-        """Pre-compile regex patterns for all terms."""
-        self.boost_patterns = {}
-        for level, terms in self.boost_terms.items():
-            self.boost_patterns[level] = [
-                re.compile(r'\b' + re.escape(term) + r'\b', re.IGNORECASE) 
-                for term in terms
-            ]
-        
-        self.drop_patterns = [
-            re.compile(r'\b' + re.escape(term) + r'\b', re.IGNORECASE)
-            for term in self.drop_terms
-        ]
-        
-        self.greylist_patterns = [
-            re.compile(r'\b' + re.escape(term) + r'\b', re.IGNORECASE)
-            for term in self.greylist_terms
-        ]
-        
-        self.greylist_keep_patterns = [
-            re.compile(r'\b' + re.escape(term) + r'\b', re.IGNORECASE)
-            for term in self.greylist_keep_keywords
-        ]
+        """
+        Pre-compile one alternation regex per term group, so each group scans
+        the text once. All patterns expect lowercased text.
+        """
+        self.boost_level_patterns = {
+            level: self._alternation(terms)
+            for level, terms in self.boost_terms.items() if terms
+        }
+        # Any boost term at any level overrides a hard drop
+        self.any_boost_pattern = self._alternation(
+            [term for terms in self.boost_terms.values() for term in terms]
+        )
+        
+        # A bucket matches if any of its keywords does
+        self.bucket_patterns = {
+            bucket['name']: self._alternation(bucket['keywords'])
+            for bucket in self.buckets if bucket['keywords']
+        }
+        
+        self.drop_pattern = self._alternation(self.drop_terms)
+        self.greylist_pattern = self._alternation(self.greylist_terms)
+        self.greylist_keep_pattern = self._alternation(self.greylist_keep_keywords)
+        self.ai_pattern = self._alternation(self.AI_TERMS)
     
     def pre_filter(self, papers: List[Dict]) -> List[Dict]:
         """
         Apply fast pre-filtering to remove obvious non-targets.
         Returns filtered list of papers with initial scores.
         """
-        filtered = []
+        joined, starts = self._join_papers(papers)
+        drop = self._matching(self.drop_pattern, joined, starts) - self._matching(self.any_boost_pattern, joined, starts)
+        greylisted = self._matching(self.greylist_pattern, joined, starts)
+        transferable = self._matching(self.greylist_keep_pattern, joined, starts)
+        results = self._scan_joined(joined, starts)
         
-        for paper in papers:
-            text = f"{paper['title']} {paper['abstract']}"
-            
+        filtered = []
+        for i, paper in enumerate(papers):
             # Check for hard drop terms (unless boost terms present)
-            if self._should_drop(text):
+            if i in drop:
                 logger.debug(f"Dropping paper {paper['arxiv_id']}: hard drop term")
                 continue
             
             # Check greylist (keep if transferable methods present)
-            if self._is_greylisted(text):
-                if not self._has_transferable_methods(text):
+            if i in greylisted:
+                if i not in transferable:
                     logger.debug(f"Dropping paper {paper['arxiv_id']}: greylisted without transferable methods")
                     continue
                 paper['greylisted'] = True
             
-            # Calculate initial heuristic score
-            paper['heuristic_score'] = self._calculate_score(text)
-            paper['detected_buckets'] = self._detect_buckets(text)
+            # Initial heuristic score
+            paper['heuristic_score'], paper['detected_buckets'] = results[i]
             
             filtered.append(paper)
         
         logger.info(f"Pre-filtered {len(papers)} papers to {len(filtered)}")
         return filtered
     
-    def _should_drop(self, text: str) -> bool:
-        """Check if paper should be hard dropped."""
-        has_drop = any(pattern.search(text) for pattern in self.drop_patterns)
-        if not has_drop:
-            return False
-        
-        # Check if any boost terms present (override drop)
-        for patterns in self.boost_patterns.values():
-            if any(p.search(text) for p in patterns):
-                return False
-        
-        return True
+    def pre_screen(self, paper: Dict, strict: bool = False) -> Tuple[str, str]:
+        """
+        Cheap local verdict used to skip LLM calls on obvious non-targets.
+        Returns ('drop' | 'keep' | 'uncertain', reason). Papers with no AI/ML
+        terms are dropped when they also match no bucket, or always when strict.
+        """
+        text_lower = f"{paper['title']} {paper['abstract']}".lower()
+        has_ai = self.ai_pattern.search(text_lower) is not None
+        buckets = paper.get('detected_buckets')
+        if buckets is None:
+            buckets = self._detect_buckets(text_lower)
+        
+        if not has_ai:
+            if not buckets:
+                return 'drop', 'no-ai-or-bucket-terms'
+            if strict:
+                return 'drop', 'no-ai-terms'
+            return 'uncertain', 'bucket-terms-without-ai'
+        
+        if buckets:
+            return 'keep', 'ai-and-bucket-terms'
+        return 'uncertain', 'ai-terms-without-bucket'
     
-    def _is_greylisted(self, text: str) -> bool:
-        """Check if paper is in greylist category."""
-        return any(pattern.search(text) for pattern in self.greylist_patterns)
+    def scan_many(self, papers: List[Dict]) -> List[Tuple[float, List[str]]]:
+        """Score each paper's title and abstract and detect its buckets, as (score, buckets) per paper."""
+        return self._scan_joined(*self._join_papers(papers))
     
-    def _has_transferable_methods(self, text: str) -> bool:
-        """Check if greylisted paper has transferable methods."""
-        return any(pattern.search(text) for pattern in self.greylist_keep_patterns)
+    @staticmethod
+    def _join_papers(papers: List[Dict]) -> Tuple[str, List[int]]:
+        """
+        Join every paper's lowercased title and abstract into one buffer,
+        without building a per-paper string, and return it with each paper's
+        start offset.
+        """
+        # \x1f is a non-word character, so word boundaries behave at the joins
+        # exactly as at the start and end of a single paper's text
+        parts = []
+        starts = []
+        offset = 0
+        for paper in papers:
+            title, abstract = paper['title'].lower(), paper['abstract'].lower()
+            starts.append(offset)
+            parts += (title, ' ', abstract, '\x1f')
+            offset += len(title) + len(abstract) + 2
+        return ''.join(parts), starts
     
-    def _calculate_score(self, text: str) -> float:
-        """Calculate heuristic relevance score based on keywords."""
-        score = 0.0
-        
-        # High priority terms (20 points each)
-        for pattern in self.boost_patterns.get('high', []):
-            matches = len(pattern.findall(text))
-            score += matches * 20
-        
-        # Medium priority terms (10 points each)
-        for pattern in self.boost_patterns.get('medium', []):
-            matches = len(pattern.findall(text))
-            score += matches * 10
-        
-        # Low priority terms (5 points each)
-        for pattern in self.boost_patterns.get('low', []):
-            matches = len(pattern.findall(text))
-            score += matches * 5
-        
-        # Base score for biomedical AI papers
-        text_lower = text.lower()
-        if any(term in text_lower for term in ['machine learning', 'deep learning', 'neural network', 'ai']):
-            if any(term in text_lower for term in ['medical', 'clinical', 'patient', 'drug', 'protein', 'diagnostic', 'healthcare']):
-                score += 20
-        
-        return min(score, 100)  # Cap at 100
+    @staticmethod
+    def _matching(pattern: Optional[re.Pattern], joined: str, starts: List[int]) -> Set[int]:
+        """Indices of the papers in a joined buffer that the pattern matches."""
+        if pattern is None:
+            return set()
+        return {bisect_right(starts, match.start()) - 1 for match in pattern.finditer(joined)}
+    
+    def _scan_joined(self, joined: str, starts: List[int]) -> List[Tuple[float, List[str]]]:
+        """Score and bucket every paper of a lowercased joined buffer, running each pattern once over it."""
+        scores = [0.0] * len(starts)
+        for level, weight in self.LEVEL_WEIGHTS:
+            pattern = self.boost_level_patterns.get(level)
+            if pattern is None:
+                continue
+            for match in pattern.finditer(joined):
+                scores[bisect_right(starts, match.start()) - 1] += weight
+        
+        matched = {name: self._matching(pattern, joined, starts) for name, pattern in self.bucket_patterns.items()}
+        
+        results = []
+        for i, score in enumerate(scores):
+            end = starts[i + 1] - 1 if i + 1 < len(starts) else len(joined) - 1
+            score += self._base_score(joined, starts[i], end)
+            # Keep buckets in config order, as _detect_buckets does
+            buckets = [name for name, indices in matched.items() if i in indices]
+            results.append((min(score, 100), buckets))
+        return results
     
-    def _detect_buckets(self, text: str) -> List[str]:
+    @classmethod
+    def _base_score(cls, text_lower: str, start: int = 0, end: Optional[int] = None) -> float:
+        """Base score for biomedical AI papers, looking only at text_lower[start:end]."""
+        if end is None:
+            end = len(text_lower)
+        if any(text_lower.find(term, start, end) != -1 for term in cls.BASE_AI_TERMS):
+            if any(text_lower.find(term, start, end) != -1 for term in cls.BASE_DOMAIN_TERMS):
+                return 20
+        return 0
+    
+    def _detect_buckets(self, text_lower: str) -> List[str]:
         """Detect which buckets this paper might belong to."""
-        detected = []
-        
-        for bucket in self.buckets:
-            bucket_name = bucket['name']
-            keywords = bucket['keywords']
-            
-            for keyword in keywords:
-                if re.search(r'\b' + re.escape(keyword) + r'\b', text, re.IGNORECASE):
-                    detected.append(bucket_name)
-                    break
-        
-        return detected
+        return [name for name, pattern in self.bucket_patterns.items() if pattern.search(text_lower)]
     
     def extract_links(self, paper: Dict) -> Tuple[List[str], List[str]]:
         """Extract code and dataset links from paper text and comments."""
-        code_urls = []
-        dataset_urls = []
-        
+        # Reads only the compiled class-level patterns, so it is safe to share across threads
         text = f"{paper.get('abstract', '')} {paper.get('comments', '')}"
         
-        # GitHub patterns
-        github_pattern = r'(https?://github\.com/[\w\-/]+)'
-        code_urls.extend(re.findall(github_pattern, text))
-        
-        # GitLab patterns
-        gitlab_pattern = r'(https?://gitlab\.com/[\w\-/]+)'
-        code_urls.extend(re.findall(gitlab_pattern, text))
-        
-        # Project page patterns
-        project_pattern = r'(https?://[\w\-\.]+\.github\.io/[\w\-/]+)'
-        code_urls.extend(re.findall(project_pattern, text))
-        
-        # Dataset patterns (common dataset hosts)
-        dataset_patterns = [
-            r'(https?://[\w\-\.]*huggingface\.co/datasets/[\w\-/]+)',
-            r'(https?://[\w\-\.]*kaggle\.com/[\w\-/]+)',
-            r'(https?://[\w\-\.]*zenodo\.org/[\w\-/]+)',
-        ]
-        
-        for pattern in dataset_patterns:
-            dataset_urls.extend(re.findall(pattern, text))
-        
         # Remove duplicates while preserving order
-        code_urls = list(dict.fromkeys(code_urls))
-        dataset_urls = list(dict.fromkeys(dataset_urls))
+        code_urls = list(dict.fromkeys(self.CODE_URL_PATTERN.findall(text)))
+        dataset_urls = list(dict.fromkeys(self.DATASET_URL_PATTERN.findall(text)))
         
         return code_urls, dataset_urls
\ No newline at end of file
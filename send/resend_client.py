@@ -1,19 +1,93 @@
 import resend
+import uuid
 import logging
-from typing import List, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from resend.exceptions import ResendError
+from resend.http_client import HTTPClient
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from typing import Dict, List, Mapping, Optional, Tuple, Union
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Resend accepts at most 100 emails per batch request
+BATCH_SIZE = 100
+
+def _is_transient(error: BaseException) -> bool:
+    """Rate limits, server errors and network failures are worth retrying; bad requests are not."""
+    if not isinstance(error, ResendError):
+        return False
+    if error.error_type == 'HttpClientError':
+        return True
+    try:
+        code = int(error.code)
+    except (TypeError, ValueError):
+        return False
+    return code == 429 or code >= 500
+
+def _idempotency_key() -> str:
+    """
+    Fresh key for one send call. Callers create it outside the retry, so every
+    attempt of that call shares it and Resend delivers the email once, while a
+    later run (a re-dispatch or another test send) gets a new key.
+    """
+    return f"digest-{uuid.uuid4()}"
+
+class SessionHTTPClient(HTTPClient):
+    """Resend HTTP client that reuses one keep-alive session instead of a new connection per call."""
+    
+    def __init__(self, timeout: int = 30):
+        self._timeout = timeout
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=10))
+    
+    def request(self,
+                method: str,
+                url: str,
+                headers: Mapping[str, str],
+                json: Optional[Union[Dict[str, object], List[object]]] = None) -> Tuple[bytes, int, Mapping[str, str]]:
+        try:
+            resp = self._session.request(method=method, url=url, headers=headers, json=json, timeout=self._timeout)
+            return resp.content, resp.status_code, resp.headers
+        except requests.RequestException as e:
+            # resend wraps this in a ResendError with error_type "HttpClientError"
+            raise RuntimeError(f"Request failed: {e}") from e
+
 class ResendClient:
     """Send emails via Resend API."""
     
     def __init__(self, api_key: str, config: dict):
         resend.api_key = api_key
+        resend.default_http_client = SessionHTTPClient()
         self.config = config
         self.from_email = config['digest']['from_email']
         self.from_name = config['digest']['from_name']
     
+    @retry(
+        stop=stop_after_attempt(5),
+        wait=wait_exponential_jitter(initial=1, max=30),
+        retry=retry_if_exception(_is_transient),
+        reraise=True
+    )
+    def _send_once(self, params: Dict, idempotency_key: str) -> Dict:
+        """
+        Send one email, retrying only on transient errors. Every attempt
+        carries the same idempotency key, so a retry after a timeout on an
+        accepted request does not send the email twice.
+        """
+        return resend.Emails.send(params, options={'idempotency_key': idempotency_key})
+    
+    @retry(
+        stop=stop_after_attempt(5),
+        wait=wait_exponential_jitter(initial=1, max=30),
+        retry=retry_if_exception(_is_transient),
+        reraise=True
+    )
+    def _send_batch_once(self, params: List[Dict], idempotency_key: str) -> Dict:
+        """Send one batch request, retrying only on transient errors under one idempotency key."""
+        return resend.Batch.send(params, options={'idempotency_key': idempotency_key})
+    
     def send_digest(self, 
                    recipients: List[str],
                    subject: str,
@@ -23,12 +97,12 @@ class ResendClient:
         from_address = f"{self.from_name} <{self.from_email}>"
         
         try:
-            response = resend.Emails.send({
+            response = self._send_once({
                 "from": from_address,
                 "to": recipients,
                 "subject": subject,
                 "html": html_content
-            })
+            }, _idempotency_key())
             
             logger.info(f"Email sent successfully to {', '.join(recipients)}")
             logger.info(f"Resend response ID: {response.get('id')}")
@@ -39,6 +113,41 @@ class ResendClient:
             logger.error(f"Failed to send email: {e}")
             return False
     
+    def send_digest_batch(self,
+                          recipients: List[str],
+                          subject: str,
+                          html_content: str) -> bool:
+        """
+        Send each recipient their own copy of the digest, submitting up to
+        BATCH_SIZE emails per request through Resend's batch endpoint.
+        """
+        
+        from_address = f"{self.from_name} <{self.from_email}>"
+        
+        try:
+            for start in range(0, len(recipients), BATCH_SIZE):
+                chunk = recipients[start:start + BATCH_SIZE]
+                response = self._send_batch_once([
+                    {
+                        "from": from_address,
+                        "to": [recipient],
+                        "subject": subject,
+                        "html": html_content
+                    }
+                    for recipient in chunk
+                ], _idempotency_key())
+                
+                ids = [item.get('id') for item in response.get('data', [])]
+                logger.info(f"Batch of {len(chunk)} emails sent, Resend response IDs: {ids}")
+            
+            logger.info(f"Email sent successfully to {', '.join(recipients)}")
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to send email batch: {e}")
+            return False
+    
     def send_test(self, recipient: str, html_content: str) -> bool:
         """Send a test email to a single recipient."""
         subject = f"[TEST] MindCo Bio Research Digest - {datetime.now().strftime('%Y-%m-%d')}"
@@ -3,15 +3,13 @@
 Send a test email with the new light-mode design using mock data.
 """
 
-import yaml
 import os
+from config_loader import load as load_config
 from render import EmailRenderer
 from send import ResendClient
 from datetime import datetime
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from pathlib import Path
+from dotenv import find_dotenv, load_dotenv
 
 # Mock data for testing - Biomedical AI papers
 mock_papers = [
@@ -102,61 +100,83 @@ mock_papers = [
     }
 ]
 
-# Load config
-with open('config.yaml', 'r') as f:
-    config = yaml.safe_load(f)
-
-# Create renderer and email client
-renderer = EmailRenderer(config)
-email_client = ResendClient(
-    api_key=os.getenv('RESEND_API_KEY'),
-    config=config
+# Buckets shown in the test email, in display order
+BUCKET_NAMES = (
+    'AI Diagnostics & Medical Imaging',
+    'Drug Discovery & Compound Screening',
+    'Protein Modeling & Bioinformatics',
+    'Neuroscience & Brain-Computer Interfaces',
+    'Genomics & Computational Biology'
 )
 
-# Organize papers
-top_picks = [p for p in mock_papers if p.get('in_top_picks', False)]
-buckets = {
-    'AI Diagnostics & Medical Imaging': [p for p in mock_papers if 'AI Diagnostics & Medical Imaging' in p.get('buckets', [])],
-    'Drug Discovery & Compound Screening': [p for p in mock_papers if 'Drug Discovery & Compound Screening' in p.get('buckets', [])],
-    'Protein Modeling & Bioinformatics': [p for p in mock_papers if 'Protein Modeling & Bioinformatics' in p.get('buckets', [])],
-    'Neuroscience & Brain-Computer Interfaces': [p for p in mock_papers if 'Neuroscience & Brain-Computer Interfaces' in p.get('buckets', [])],
-    'Genomics & Computational Biology': [p for p in mock_papers if 'Genomics & Computational Biology' in p.get('buckets', [])]
-}
-also_noteworthy = []
-filtered_out = []
-
-# Render email
-html = renderer.render(
-    top_picks=top_picks,
-    buckets=buckets,
-    also_noteworthy=also_noteworthy,
-    filtered_out=filtered_out,
-    metadata={'total_papers': len(mock_papers)}
-)
+# Set once the .env file has been read, so repeated main() calls don't re-parse it
+_DOTENV_LOADED = False
 
-# Send email
-subject = f"Bio Daily Research Digest - {datetime.now().strftime('%a, %b %d')} [Test Email]"
-recipients = config['digest']['recipients']
+def _load_env():
+    """Load .env into os.environ once, without overriding variables already set."""
+    global _DOTENV_LOADED
+    if not _DOTENV_LOADED:
+        load_dotenv(find_dotenv(usecwd=True), override=False)
+        _DOTENV_LOADED = True
+
+def main():
+    """Render the mock digest, send it to the configured recipients and save a preview."""
+    _load_env()
+
+    config = load_config()
+
+    # Create renderer and email client
+    renderer = EmailRenderer(config)
+    email_client = ResendClient(
+        api_key=os.environ.get('RESEND_API_KEY'),
+        config=config
+    )
+
+    # Organize papers in one pass, listing each paper under every bucket it has
+    top_picks = [p for p in mock_papers if p.get('in_top_picks', False)]
+    buckets = {name: [] for name in BUCKET_NAMES}
+    for paper in mock_papers:
+        for bucket in paper.get('buckets', ()):
+            if bucket in buckets:
+                buckets[bucket].append(paper)
+    also_noteworthy = []
+    filtered_out = []
+
+    # Render email
+    html = renderer.render(
+        top_picks=top_picks,
+        buckets=buckets,
+        also_noteworthy=also_noteworthy,
+        filtered_out=filtered_out,
+        metadata={'total_papers': len(mock_papers)}
+    )
+
+    # Send email
+    subject = f"Bio Daily Research Digest - {datetime.now().strftime('%a, %b %d')} [Test Email]"
+    recipients = config['digest']['recipients']
+
+    success = email_client.send_digest(
+        recipients=recipients,
+        subject=subject,
+        html_content=html
+    )
+
+    if success:
+        print(f"✅ Test email sent successfully to {recipients}")
+        print("📧 Email contains biomedical AI research papers:")
+        print("   • Protein structure prediction (AlphaFold-related)")
+        print("   • Mitochondrial genomics analysis")
+        print("   • AI for dementia diagnosis (MRI/PET imaging)")
+        print("   • Cancer tumor simulation")
+        print("   • Gene expression control for biotech")
+    else:
+        print("❌ Failed to send email")
+
+    # Also save to file for preview (UTF-8 bytes, no newline translation)
+    Path('bio_digest_preview.html').write_bytes(html.encode('utf-8'))
+
+    print("📄 Preview saved to: bio_digest_preview.html")
 
-success = email_client.send_digest(
-    recipients=recipients,
-    subject=subject,
-    html_content=html
-)
 
-if success:
-    print(f"✅ Test email sent successfully to {recipients}")
-    print("📧 Email contains biomedical AI research papers:")
-    print("   • Protein structure prediction (AlphaFold-related)")
-    print("   • Mitochondrial genomics analysis")
-    print("   • AI for dementia diagnosis (MRI/PET imaging)")
-    print("   • Cancer tumor simulation")
-    print("   • Gene expression control for biotech")
-else:
-    print("❌ Failed to send email")
-
-# Also save to file for preview
-with open('bio_digest_preview.html', 'w') as f:
-    f.write(html)
-
-print("📄 Preview saved to: bio_digest_preview.html")
+if __name__ == '__main__':
+    main()
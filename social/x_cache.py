@@ -0,0 +1,11 @@
+from store import IdCache
+
+class XPostCache(IdCache):
+    """X post search result per arXiv id, so repeat runs skip the web searches."""
+
+    TABLE = 'x_posts'
+    COLUMN = 'x_url'
+    LABEL = 'X post'
+    # "No post" is cached for less time, since posts about a paper can appear later
+    CONFIG_SECTION = 'features'
+    CONFIG_PREFIX = 'x_cache'
@@ -1,22 +1,53 @@
 import re
 import logging
 import requests
-from urllib.parse import quote_plus
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus, urlparse
 from typing import Dict, Optional, List
-from bs4 import BeautifulSoup
-import time
+import lxml.html
+
+from limiters import DomainLimiter
+from .x_cache import XPostCache
 
 logger = logging.getLogger(__name__)
 
 class XFinder:
     """Find X/Twitter posts about papers using best-effort web search."""
     
-    def __init__(self, config: dict):
+    # Compiled once; applied per search result
+    TITLE_CLEAN_PATTERN = re.compile(r'[^\w\s]')
+    UDDG_PATTERN = re.compile(r'uddg=(https?://(?:x\.com|twitter\.com)/[^&]+)')
+    ENCODED_PARAMS_PATTERN = re.compile(r'%3F.*$')
+    X_STATUS_PATTERN = re.compile(r'(https?://x\.com/\w+/status/\d+)')
+    STATUS_URL_PATTERN = re.compile(r'https?://(?:x\.com|twitter\.com)/\w+/status/\d+')
+    
+    def __init__(self, config: dict, session: Optional[requests.Session] = None):
         self.enabled = config.get('features', {}).get('include_x_posts', False)
+        # Only opened when X lookups are on
+        self.cache = XPostCache.from_config(config) if self.enabled else None
+        # Shared with the other enrichment steps when provided, so connections are reused
+        if session is None:
+            # Sized for batch_find's worker threads
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=32))
+        self.session = session
+        # Runs the Google fallback alongside the DuckDuckGo queries; only needed when X lookups are on
+        self._engine_pool = ThreadPoolExecutor(max_workers=8) if self.enabled else None
+        # Search engines block bursts, so concurrent searches are paced per host
+        self.limiter = DomainLimiter(config.get('features', {}).get('x_search_interval_ms', 500) / 1000)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
     
+    def close(self):
+        """Stop the search worker threads and close the post cache."""
+        if self._engine_pool is not None:
+            self._engine_pool.shutdown(cancel_futures=True)
+            self._engine_pool = None
+        if self.cache is not None:
+            self.cache.close()
+    
     def find_x_post(self, paper: Dict) -> Dict:
         """Find X/Twitter post for a paper using best-effort search."""
         
@@ -27,8 +58,14 @@ class XFinder:
         if not arxiv_id:
             return paper
         
+        # Reuse a recent search for this paper, including "no post found"
+        hit, x_url = self.cache.get(arxiv_id)
+        if hit:
+            if x_url:
+                paper['x_url'] = x_url
+            return paper
+        
         # Try multiple search strategies
-        x_url = None
         
         # Strategy 1: Search for arXiv ID
         x_url = self._search_for_arxiv_id(arxiv_id)
@@ -37,6 +74,8 @@ class XFinder:
         if not x_url and paper.get('title'):
             x_url = self._search_for_title(paper['title'], arxiv_id)
         
+        self.cache.set(arxiv_id, x_url)
+        
         if x_url:
             paper['x_url'] = x_url
             logger.info(f"Found X post for {arxiv_id}: {x_url}")
@@ -45,38 +84,40 @@ class XFinder:
         
         return paper
     
+    def _get(self, url: str) -> requests.Response:
+        """GET a page once its host's rate limit allows."""
+        self.limiter.wait(urlparse(url).netloc)
+        return self.session.get(url, headers=self.headers, timeout=10)
+    
     def _search_for_arxiv_id(self, arxiv_id: str) -> Optional[str]:
         """Search for X posts mentioning the arXiv ID."""
         
-        # Try different search engines for better coverage
-        
-        # Method 1: DuckDuckGo HTML search
-        url = self._search_duckduckgo(f'site:x.com "{arxiv_id}"')
-        if url:
-            return url
-        
-        # Method 2: Try with different query format
-        url = self._search_duckduckgo(f'site:twitter.com OR site:x.com arxiv {arxiv_id}')
-        if url:
-            return url
-        
-        # Method 3: Google search (as fallback)
-        url = self._search_google(f'site:x.com "{arxiv_id}"')
-        if url:
-            return url
-        
-        # Method 4: Try direct X search URL (simple fallback)
-        url = self._search_direct_x(arxiv_id)
-        if url:
-            return url
-        
-        return None
+        # Try different search engines for better coverage, in priority order,
+        # stopping at the first hit. Google is queried in the background while
+        # DuckDuckGo runs, so a miss there costs max(engines) rather than their sum.
+        google = self._engine_pool.submit(self._search_google, f'site:x.com "{arxiv_id}"')
+        strategies = (
+            # DuckDuckGo HTML search, then a looser query format
+            lambda: self._search_duckduckgo(f'site:x.com "{arxiv_id}"'),
+            lambda: self._search_duckduckgo(f'site:twitter.com OR site:x.com arxiv {arxiv_id}'),
+            # Google search (as fallback)
+            google.result,
+            # Direct X search URL (simple fallback)
+            lambda: self._search_direct_x(arxiv_id),
+        )
+        
+        url = next((url for url in (strategy() for strategy in strategies) if url), None)
+        # Only drops the Google search if it is still queued. A pool worker picks it
+        # up at once and then waits in the limiter, so it has almost always started
+        # and a DuckDuckGo hit does not save the Google request
+        google.cancel()
+        return url
     
     def _search_for_title(self, title: str, arxiv_id: str) -> Optional[str]:
         """Search for X posts mentioning the paper title."""
         
         # Clean and shorten title for search
-        title_clean = re.sub(r'[^\w\s]', '', title)
+        title_clean = self.TITLE_CLEAN_PATTERN.sub('', title)
         title_words = title_clean.split()[:8]  # Use first 8 words
         title_short = ' '.join(title_words)
         
@@ -97,11 +138,7 @@ class XFinder:
         try:
             search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
             
-            response = requests.get(
-                search_url, 
-                headers=self.headers, 
-                timeout=10
-            )
+            response = self._get(search_url)
             
             # Handle redirects and blocking
             if response.status_code not in [200, 202]:
@@ -112,26 +149,28 @@ class XFinder:
             if response.status_code == 202:
                 # Try alternative DuckDuckGo endpoint
                 alt_url = f"https://duckduckgo.com/html/?q={quote_plus(query)}"
-                response = requests.get(alt_url, headers=self.headers, timeout=10)
+                response = self._get(alt_url)
                 if response.status_code != 200:
                     logger.debug(f"DuckDuckGo alt endpoint returned status {response.status_code}")
                     return None
             
-            # Parse HTML to find X.com links
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Parse HTML to find X.com links (libxml2 parser; only the anchors are needed)
+            anchors = list(lxml.html.fromstring(response.content).iter('a'))
             
             # Look for result links
-            for result in soup.find_all('a', class_='result__a'):
+            for result in anchors:
+                if 'result__a' not in (result.get('class') or '').split():
+                    continue
                 href = result.get('href', '')
                 
                 # Extract actual URL from DuckDuckGo redirect
                 if 'x.com' in href or 'twitter.com' in href:
                     # DuckDuckGo wraps URLs, extract the actual URL
-                    match = re.search(r'uddg=(https?://(?:x\.com|twitter\.com)/[^&]+)', href)
+                    match = self.UDDG_PATTERN.search(href)
                     if match:
                         actual_url = match.group(1)
                         # Clean up URL
-                        actual_url = re.sub(r'%3F.*$', '', actual_url)  # Remove encoded params
+                        actual_url = self.ENCODED_PARAMS_PATTERN.sub('', actual_url)  # Remove encoded params
                         actual_url = actual_url.replace('%2F', '/')
                         
                         # Validate it's a status URL
@@ -139,11 +178,11 @@ class XFinder:
                             return actual_url
             
             # Alternative parsing for direct links
-            for link in soup.find_all('a'):
+            for link in anchors:
                 href = link.get('href', '')
                 if 'x.com' in href and '/status/' in href:
                     # Extract clean URL
-                    match = re.search(r'(https?://x\.com/\w+/status/\d+)', href)
+                    match = self.X_STATUS_PATTERN.search(href)
                     if match:
                         return match.group(1)
             
@@ -159,24 +198,16 @@ class XFinder:
             # Note: This is fragile and may be blocked
             search_url = f"https://www.google.com/search?q={quote_plus(query)}"
             
-            response = requests.get(
-                search_url,
-                headers=self.headers,
-                timeout=10
-            )
+            response = self._get(search_url)
             
             if response.status_code != 200:
                 return None
             
-            # Look for X.com URLs in the response
-            matches = re.findall(
-                r'https?://(?:x\.com|twitter\.com)/\w+/status/\d+',
-                response.text
-            )
+            # Return the first X.com URL in the response, stopping the scan there
+            match = self.STATUS_URL_PATTERN.search(response.text)
             
-            if matches:
-                # Return first valid match
-                return matches[0]
+            if match:
+                return match.group(0)
             
         except Exception as e:
             logger.debug(f"Google search failed: {e}")
@@ -197,7 +228,7 @@ class XFinder:
         """Validate that an X post actually mentions the arXiv ID."""
         
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self._get(url)
             if response.status_code == 200:
                 # Check if the arXiv ID appears in the post content
                 return arxiv_id in response.text
@@ -215,20 +246,17 @@ class XFinder:
         
         return True
     
-    def batch_find(self, papers: List[Dict]) -> List[Dict]:
-        """Find X posts for multiple papers with rate limiting."""
+    def batch_find(self, papers: List[Dict], concurrency: int = 8) -> List[Dict]:
+        """Find X posts for multiple papers concurrently, preserving order."""
         
-        if not self.enabled:
+        if not self.enabled or not papers:
             return papers
         
         logger.info(f"Searching for X posts for {len(papers)} papers...")
         
-        for i, paper in enumerate(papers):
-            paper = self.find_x_post(paper)
-            
-            # Rate limiting to be respectful
-            if i < len(papers) - 1:
-                time.sleep(0.5)  # 500ms between searches
+        # Searches overlap across papers; the limiter still spaces requests to each engine
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(papers))) as executor:
+            papers = list(executor.map(self.find_x_post, papers))
         
         x_found = sum(1 for p in papers if 'x_url' in p)
         logger.info(f"Found X posts for {x_found}/{len(papers)} papers")
@@ -1,3 +1,4 @@
 from .db import Database
+from .id_cache import IdCache
 
-__all__ = ['Database']
\ No newline at end of file
+__all__ = ['Database', 'IdCache']
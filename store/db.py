@@ -1,23 +1,40 @@
 import sqlite3
 import json
 import logging
-from datetime import datetime
-from typing import List, Dict, Optional
+import threading
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Set, Tuple
 import os
 
 logger = logging.getLogger(__name__)
 
+# json.dumps([]), stored for papers without buckets
+EMPTY_JSON_LIST = '[]'
+
 class Database:
     """SQLite database for tracking processed papers and metrics."""
     
     def __init__(self, db_path: str = "./digest.db"):
         self.db_path = db_path
+        # One connection for the object's lifetime, shared by the pipeline's
+        # worker threads; access is serialized by _lock
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        # Metrics from log_metric, written in one transaction by flush_metrics
+        self._metric_buffer: List[Tuple[datetime, str, float, Optional[str]]] = []
         self._init_db()
     
     def _init_db(self):
-        """Initialize database tables."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        """Apply connection pragmas and initialize database tables."""
+        with self._lock, self.conn:
+            cursor = self.conn.cursor()
+            
+            cursor.execute("PRAGMA journal_mode=WAL")
+            # Safe with WAL: a crash can lose the last commits but not corrupt the file
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA cache_size=-65536")  # 64 MB page cache
+            cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
             
             # Papers table
             cursor.execute("""
@@ -33,6 +50,40 @@ class Database:
                 )
             """)
             
+            # Covering index for the seen-paper checks (arxiv_id plus version),
+            # and one for time-window queries on processed_at
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_papers_arxiv_version ON papers(arxiv_id, version)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_papers_processed_at ON papers(processed_at)"
+            )
+            
+            # Bucket membership, one row per (paper, bucket), so bucket queries use
+            # an index instead of decoding papers.buckets row by row
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'paper_buckets'"
+            )
+            backfill_buckets = cursor.fetchone() is None
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS paper_buckets (
+                    arxiv_id TEXT,
+                    bucket TEXT,
+                    PRIMARY KEY (arxiv_id, bucket)
+                )
+            """)
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_paper_buckets_bucket ON paper_buckets(bucket)"
+            )
+            if backfill_buckets:
+                # Existing databases only have the JSON column; copy it across once
+                cursor.execute("""
+                    INSERT OR IGNORE INTO paper_buckets (arxiv_id, bucket)
+                    SELECT papers.arxiv_id, buckets.value
+                    FROM papers, json_each(papers.buckets) AS buckets
+                    WHERE json_valid(papers.buckets)
+                """)
+            
             # Digest runs table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS digest_runs (
@@ -57,50 +108,102 @@ class Database:
                     metadata TEXT
                 )
             """)
-            
-            conn.commit()
+    
+    def close(self):
+        """Flush buffered metrics and close the underlying connection."""
+        if self.conn is not None:
+            self.flush_metrics()
+        with self._lock:
+            if self.conn is not None:
+                # Refresh planner statistics where stale, so lookups pick the covering index
+                self.conn.execute("PRAGMA optimize")
+                self.conn.close()
+                self.conn = None
     
     def has_seen_paper(self, arxiv_id: str, version: int = None) -> bool:
         """Check if we've already processed this paper (and version)."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        return (arxiv_id, version) in self.get_seen_set([(arxiv_id, version)])
+    
+    # Stay under SQLite's default limit on bound parameters per statement
+    SEEN_QUERY_CHUNK = 900
+    
+    def get_seen_set(self, ids: List[Tuple[str, int]]) -> Set[Tuple[str, int]]:
+        """
+        Batch version of has_seen_paper: return the (arxiv_id, version) pairs
+        already processed, using one query per chunk of ids.
+        """
+        unique_ids = list(dict.fromkeys(arxiv_id for arxiv_id, _ in ids))
+        max_versions = {}
+        
+        with self._lock:
+            cursor = self.conn.cursor()
             
-            if version:
-                cursor.execute(
-                    "SELECT 1 FROM papers WHERE arxiv_id = ? AND version >= ?",
-                    (arxiv_id, version)
-                )
-            else:
+            for start in range(0, len(unique_ids), self.SEEN_QUERY_CHUNK):
+                chunk = unique_ids[start:start + self.SEEN_QUERY_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
                 cursor.execute(
-                    "SELECT 1 FROM papers WHERE arxiv_id = ?",
-                    (arxiv_id,)
+                    f"SELECT arxiv_id, MAX(version) FROM papers WHERE arxiv_id IN ({placeholders}) GROUP BY arxiv_id",
+                    chunk
                 )
-            
-            return cursor.fetchone() is not None
+                max_versions.update(cursor.fetchall())
+        
+        seen = set()
+        for arxiv_id, version in ids:
+            if arxiv_id not in max_versions:
+                continue
+            max_version = max_versions[arxiv_id]
+            if not version or (max_version is not None and max_version >= version):
+                seen.add((arxiv_id, version))
+        return seen
     
     def save_papers(self, papers: List[Dict]):
         """Save processed papers to database."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            for paper in papers:
-                cursor.execute("""
-                    INSERT OR REPLACE INTO papers 
-                    (arxiv_id, title, processed_at, relevance_score, kept, buckets, in_top_picks, version)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    paper['arxiv_id'],
-                    paper['title'],
-                    datetime.now(),
-                    paper.get('relevance_score', 0),
-                    paper.get('keep', False),
-                    json.dumps(paper.get('buckets', [])),
-                    paper.get('in_top_picks', False),
-                    paper.get('version', 1)
-                ))
+        if not papers:
+            return
+        
+        processed_at = datetime.now()
+        dumps = json.dumps
+        rows = [
+            (
+                paper['arxiv_id'],
+                paper['title'],
+                processed_at,
+                paper.get('relevance_score', 0),
+                paper.get('keep', False),
+                # Most papers have no buckets; skip the encoder for those
+                dumps(buckets) if (buckets := paper.get('buckets')) else EMPTY_JSON_LIST,
+                paper.get('in_top_picks', False),
+                paper.get('version', 1)
+            )
+            for paper in papers
+        ]
+        # The JSON column is still written for older readers
+        bucket_rows = [
+            (paper['arxiv_id'], bucket)
+            for paper in papers
+            for bucket in paper.get('buckets', [])
+        ]
+        
+        # One transaction for the whole batch, taking the write lock up front
+        # so it cannot fail half way on a lock upgrade
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO papers 
+                (arxiv_id, title, processed_at, relevance_score, kept, buckets, in_top_picks, version)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            # Replace, not merge, the bucket rows of re-saved papers
+            self.conn.executemany(
+                "DELETE FROM paper_buckets WHERE arxiv_id = ?",
+                [(paper['arxiv_id'],) for paper in papers]
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO paper_buckets (arxiv_id, bucket) VALUES (?, ?)",
+                bucket_rows
+            )
             
-            conn.commit()
-            logger.info(f"Saved {len(papers)} papers to database")
+        logger.info(f"Saved {len(papers)} papers to database")
     
     def log_run(self, 
                 papers_fetched: int,
@@ -110,10 +213,8 @@ class Database:
                 recipients: List[str],
                 error: Optional[str] = None):
         """Log a digest run."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+        with self._lock, self.conn:
+            self.conn.execute("""
                 INSERT INTO digest_runs 
                 (run_at, papers_fetched, papers_kept, top_picks_count, email_sent, recipients, error)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -126,36 +227,73 @@ class Database:
                 json.dumps(recipients),
                 error
             ))
-            
-            conn.commit()
+    
+    # Buffered metrics are written once this many have accumulated
+    METRIC_BUFFER_SIZE = 500
     
     def log_metric(self, name: str, value: float, metadata: Dict = None):
-        """Log a metric."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+        """Buffer a metric; it is written by flush_metrics, at the latest on close()."""
+        row = (datetime.now(), name, value, json.dumps(metadata) if metadata else None)
+        with self._lock:
+            self._metric_buffer.append(row)
+            full = len(self._metric_buffer) >= self.METRIC_BUFFER_SIZE
+        if full:
+            self.flush_metrics()
+    
+    def flush_metrics(self):
+        """Write buffered metrics in one transaction."""
+        with self._lock:
+            rows, self._metric_buffer = self._metric_buffer, []
+        if rows:
+            self._insert_metrics(rows)
+    
+    def log_metrics(self, metrics: List[Tuple[str, float, Optional[Dict]]]):
+        """Log several (name, value, metadata) metrics in one transaction."""
+        timestamp = datetime.now()
+        self._insert_metrics([
+            (timestamp, name, value, json.dumps(metadata) if metadata else None)
+            for name, value, metadata in metrics
+        ])
+    
+    def _insert_metrics(self, rows: List[Tuple[datetime, str, float, Optional[str]]]):
+        with self._lock, self.conn:
+            self.conn.executemany("""
                 INSERT INTO metrics (timestamp, metric_name, metric_value, metadata)
                 VALUES (?, ?, ?, ?)
-            """, (
-                datetime.now(),
-                name,
-                value,
-                json.dumps(metadata) if metadata else None
-            ))
-            
-            conn.commit()
+            """, rows)
+    
+    @staticmethod
+    def _fetch_dicts(cursor: sqlite3.Cursor) -> List[Dict]:
+        """Materialize a cursor's rows as dicts, reading the column names once."""
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
     
     def get_recent_papers(self, days: int = 7) -> List[Dict]:
         """Get recently processed papers."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+        with self._lock:
+            cursor = self.conn.cursor()
             
+            # processed_at is stored as local time in ISO format, so a cutoff
+            # computed the same way compares correctly and can use the index
+            cutoff = datetime.now() - timedelta(days=days)
             cursor.execute("""
                 SELECT * FROM papers
-                WHERE processed_at > datetime('now', '-' || ? || ' days')
+                WHERE processed_at > ?
                 ORDER BY processed_at DESC
-            """, (days,))
+            """, (cutoff.isoformat(' '),))
+            
+            return self._fetch_dicts(cursor)
+    
+    def get_papers_in_bucket(self, bucket: str) -> List[Dict]:
+        """Get processed papers assigned to a bucket, newest first."""
+        with self._lock:
+            cursor = self.conn.cursor()
+            
+            cursor.execute("""
+                SELECT papers.* FROM paper_buckets
+                JOIN papers ON papers.arxiv_id = paper_buckets.arxiv_id
+                WHERE paper_buckets.bucket = ?
+                ORDER BY papers.processed_at DESC
+            """, (bucket,))
             
-            return [dict(row) for row in cursor.fetchall()]
\ No newline at end of file
+            return self._fetch_dicts(cursor)
\ No newline at end of file
@@ -0,0 +1,115 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class IdCache:
+    """
+    SQLite cache of one lookup result per arXiv id, so repeat runs skip the
+    network. A result of None ("nothing found") is cached too, usually for less time.
+
+    Subclasses name the table, value column, log label and the config keys
+    they are built from.
+    """
+
+    TABLE = 'results'
+    COLUMN = 'value'
+    LABEL = 'Lookup'
+    # from_config reads <CONFIG_PREFIX>_path, _ttl_hours, _miss_ttl_hours and _enabled
+    CONFIG_SECTION = ''
+    CONFIG_PREFIX = ''
+    DEFAULT_TTL_HOURS: Optional[float] = 168
+    DEFAULT_MISS_TTL_HOURS: Optional[float] = 24
+
+    def __init__(self, path: str, ttl_hours: Optional[float] = 168,
+                 miss_ttl_hours: Optional[float] = 24, enabled: bool = True):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600 if ttl_hours else None
+        self.miss_ttl_seconds = miss_ttl_hours * 3600 if miss_ttl_hours else None
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if self.enabled:
+            self._init_db()
+
+    def _init_db(self):
+        """Open the cache database, disabling the cache if that fails."""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # Shared by the enrichment worker threads; access is serialized by _lock
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                    arxiv_id TEXT PRIMARY KEY,
+                    {self.COLUMN} TEXT,
+                    created_at INTEGER
+                )
+            """)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"{self.LABEL} cache disabled, could not open {self.path}: {e}")
+            self.enabled = False
+            self._conn = None
+
+    def get(self, arxiv_id: str) -> Tuple[bool, Optional[str]]:
+        """Return (hit, value); a hit with value None means nothing was found last time."""
+        if not self.enabled:
+            return False, None
+
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {self.COLUMN}, created_at FROM {self.TABLE} WHERE arxiv_id = ?",
+                (arxiv_id,)
+            ).fetchone()
+
+        if row is None:
+            return False, None
+
+        value, created_at = row
+        ttl = self.ttl_seconds if value else self.miss_ttl_seconds
+        if ttl and time.time() - created_at > ttl:
+            return False, None
+        return True, value
+
+    def set(self, arxiv_id: str, value: Optional[str]):
+        """Store a lookup result, including "nothing found" as None."""
+        if not self.enabled:
+            return
+
+        try:
+            with self._lock:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.TABLE} (arxiv_id, {self.COLUMN}, created_at) VALUES (?, ?, ?)",
+                    (arxiv_id, value, int(time.time()))
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to write {self.LABEL} cache entry: {e}")
+
+    def close(self):
+        """Close the underlying connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            self.enabled = False
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'IdCache':
+        """Build a cache from the subclass's section of the app config."""
+        section = (config or {}).get(cls.CONFIG_SECTION, {})
+        prefix = cls.CONFIG_PREFIX
+        return cls(
+            path=section.get(f'{prefix}_path', f'.cache/{cls.TABLE}.sqlite'),
+            ttl_hours=section.get(f'{prefix}_ttl_hours', cls.DEFAULT_TTL_HOURS),
+            miss_ttl_hours=section.get(f'{prefix}_miss_ttl_hours', cls.DEFAULT_MISS_TTL_HOURS),
+            enabled=section.get(f'{prefix}_enabled', True)
+        )
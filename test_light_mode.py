@@ -3,7 +3,7 @@
 Test script to generate a sample email with the new light-mode design.
 """
 
-import yaml
+from config_loader import load as load_config
 from render import EmailRenderer
 from datetime import datetime
 
@@ -63,8 +63,7 @@ mock_papers = [
 ]
 
 # Load config
-with open('config.yaml', 'r') as f:
-    config = yaml.safe_load(f)
+config = load_config()
 
 # Create renderer
 renderer = EmailRenderer(config)
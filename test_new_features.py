@@ -2,59 +2,87 @@
 """
 Test script for new Robotics Digest features.
 Tests figure extraction, X post finding, digest summary, and web view generation.
+
+Run it directly (python test_new_features.py). The checks report through
+their return values, which main() collects while running the network-bound
+ones concurrently, so they are not meant to be collected by pytest.
 """
 
+import copy
+import importlib
 import os
 import sys
-import yaml
-from datetime import datetime
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from io import StringIO
+from typing import Optional, TextIO
+from requests.adapters import HTTPAdapter
+
+from config_loader import load as load_config
+
+@lru_cache(maxsize=1)
+def _get_session() -> requests.Session:
+    """One pooled session shared by the network tests, so connections and TLS sessions are reused."""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+    return session
+
+
+# Modules and classes added by the new features, warmed up by test_imports
+FEATURE_CLASSES = (
+    ('media.figure_extractor', 'FigureExtractor'),
+    ('social.x_finder', 'XFinder'),
+    ('llm.summarize', 'DigestSummarizer'),
+    ('render.web_renderer', 'WebRenderer'),
+)
+
+# Classes resolved by test_imports, keyed by class name
+_feature_classes = {}
 
-def test_imports():
+
+def _feature_class(class_name: str) -> type:
+    """Return a feature class, importing it if test_imports has not already."""
+    if class_name not in _feature_classes:
+        module_path = next(path for path, name in FEATURE_CLASSES if name == class_name)
+        _feature_classes[class_name] = getattr(importlib.import_module(module_path), class_name)
+    return _feature_classes[class_name]
+
+
+def test_imports(buf: Optional[TextIO] = None):
     """Test that all new modules can be imported."""
-    print("Testing imports...")
-    
-    try:
-        from media.figure_extractor import FigureExtractor
-        print("  ✅ FigureExtractor imported")
-    except ImportError as e:
-        print(f"  ❌ Failed to import FigureExtractor: {e}")
-        return False
-    
-    try:
-        from social.x_finder import XFinder
-        print("  ✅ XFinder imported")
-    except ImportError as e:
-        print(f"  ❌ Failed to import XFinder: {e}")
-        return False
-    
-    try:
-        from llm.summarize import DigestSummarizer
-        print("  ✅ DigestSummarizer imported")
-    except ImportError as e:
-        print(f"  ❌ Failed to import DigestSummarizer: {e}")
-        return False
-    
-    try:
-        from render.web_renderer import WebRenderer
-        print("  ✅ WebRenderer imported")
-    except ImportError as e:
-        print(f"  ❌ Failed to import WebRenderer: {e}")
-        return False
+    log = buf if buf is not None else sys.stdout
+    print("Testing imports...", file=log)
+    
+    # The resolved classes are kept for the other tests
+    for module_path, class_name in FEATURE_CLASSES:
+        try:
+            _feature_classes[class_name] = getattr(importlib.import_module(module_path), class_name)
+            print(f"  ✅ {class_name} imported", file=log)
+        except (ImportError, AttributeError) as e:
+            print(f"  ❌ Failed to import {class_name}: {e}", file=log)
+            return False
     
     return True
 
 
-def test_figure_extraction():
+def test_figure_extraction(buf: Optional[TextIO] = None):
     """Test figure extraction with a sample paper."""
-    print("\nTesting figure extraction...")
+    log = buf if buf is not None else sys.stdout
+    print("\nTesting figure extraction...", file=log)
     
-    from media.figure_extractor import FigureExtractor
+    if not os.getenv('RUN_NETWORK_TESTS'):
+        print("  ⚠️  RUN_NETWORK_TESTS not set, skipping network test", file=log)
+        return True
+    
+    FigureExtractor = _feature_class('FigureExtractor')
     
-    # Load config
-    with open('config.yaml', 'r') as f:
-        config = yaml.safe_load(f)
+    config = load_config()
     
-    extractor = FigureExtractor(config)
+    # Results persist in the figure cache (media.figure_cache_*), so re-runs
+    # for the same paper make no requests
+    extractor = FigureExtractor(config, session=_get_session())
     
     # Test paper
     test_paper = {
@@ -66,29 +94,33 @@ def test_figure_extraction():
     result = extractor.extract_figure(test_paper)
     
     if 'figure_url' in result:
-        print(f"  ✅ Found figure: {result['figure_url']}")
+        print(f"  ✅ Found figure: {result['figure_url']}", file=log)
     elif 'needs_pdf_preview' in result:
-        print(f"  ⚠️  No figure found, marked for PDF preview")
+        print(f"  ⚠️  No figure found, marked for PDF preview", file=log)
     else:
-        print(f"  ❌ Figure extraction failed")
+        print(f"  ❌ Figure extraction failed", file=log)
     
     return True
 
 
-def test_x_finder():
+def test_x_finder(buf: Optional[TextIO] = None):
     """Test X/Twitter post finding."""
-    print("\nTesting X post finder...")
+    log = buf if buf is not None else sys.stdout
+    print("\nTesting X post finder...", file=log)
+    
+    if not os.getenv('RUN_NETWORK_TESTS'):
+        print("  ⚠️  RUN_NETWORK_TESTS not set, skipping network test", file=log)
+        return True
     
-    from social.x_finder import XFinder
+    XFinder = _feature_class('XFinder')
     
-    # Load config
-    with open('config.yaml', 'r') as f:
-        config = yaml.safe_load(f)
+    config = copy.deepcopy(dict(load_config()))
     
     # Enable X posts for testing
     config['features']['include_x_posts'] = True
     
-    finder = XFinder(config)
+    # Likewise persisted in the X post cache (features.x_cache_*)
+    finder = XFinder(config, session=_get_session())
     
     # Test paper (use a well-known paper that likely has X posts)
     test_paper = {
@@ -100,66 +132,69 @@ def test_x_finder():
     result = finder.find_x_post(test_paper)
     
     if 'x_url' in result:
-        print(f"  ✅ Found X post: {result['x_url']}")
+        print(f"  ✅ Found X post: {result['x_url']}", file=log)
     else:
-        print(f"  ⚠️  No X post found (this is OK if X posts are disabled)")
+        print(f"  ⚠️  No X post found (this is OK if X posts are disabled)", file=log)
     
     return True
 
 
-def test_digest_summary():
+# Fixed input for test_digest_summary, built once at import
+SUMMARY_TEST_PAPERS = (
+    {
+        'title': 'Dual-Arm Manipulation with Vision-Language Models',
+        'final_score': 85,
+        'buckets': ['VLA / LLM-in-the-Loop', 'Bimanual / Dual-Arm Manipulation'],
+        'why_it_matters': 'Direct application to our dual-arm system',
+        'summary': 'New VLA approach for coordinated dual-arm tasks'
+    },
+    {
+        'title': 'Diffusion Policy for Robotic Grasping',
+        'final_score': 75,
+        'buckets': ['Imitation / Diffusion / RL', 'Grasping & Dexterous Manipulation'],
+        'why_it_matters': 'Improves grasp success rate significantly',
+        'summary': 'Uses diffusion models for grasp planning'
+    }
+)
+
+
+def test_digest_summary(buf: Optional[TextIO] = None):
     """Test digest summary generation."""
-    print("\nTesting digest summary generation...")
+    log = buf if buf is not None else sys.stdout
+    print("\nTesting digest summary generation...", file=log)
     
     # Check if API key is available
     api_key = os.getenv('GEMINI_API_KEY')
     if not api_key:
-        print("  ⚠️  GEMINI_API_KEY not set, skipping summary test")
+        print("  ⚠️  GEMINI_API_KEY not set, skipping summary test", file=log)
         return True
     
-    from llm.summarize import DigestSummarizer
-    
-    summarizer = DigestSummarizer(api_key)
+    DigestSummarizer = _feature_class('DigestSummarizer')
     
-    # Test papers
-    test_papers = [
-        {
-            'title': 'Dual-Arm Manipulation with Vision-Language Models',
-            'final_score': 85,
-            'buckets': ['VLA / LLM-in-the-Loop', 'Bimanual / Dual-Arm Manipulation'],
-            'why_it_matters': 'Direct application to our dual-arm system',
-            'summary': 'New VLA approach for coordinated dual-arm tasks'
-        },
-        {
-            'title': 'Diffusion Policy for Robotic Grasping',
-            'final_score': 75,
-            'buckets': ['Imitation / Diffusion / RL', 'Grasping & Dexterous Manipulation'],
-            'why_it_matters': 'Improves grasp success rate significantly',
-            'summary': 'Uses diffusion models for grasp planning'
-        }
-    ]
+    # With the app config the summarizer uses the same model and LLM response
+    # cache as the pipeline, so re-runs on these fixed papers skip Gemini
+    summarizer = DigestSummarizer(api_key, config=load_config())
     
     try:
-        summary = summarizer.generate_summary(test_papers)
-        print(f"  ✅ Generated summary: {summary.get('headline', 'N/A')}")
-        print(f"     Bullets: {len(summary.get('bullets', []))}")
-        print(f"     Highlights: {len(summary.get('highlights', []))}")
+        summary = summarizer.generate_summary(SUMMARY_TEST_PAPERS)
+        print(f"  ✅ Generated summary: {summary.get('headline', 'N/A')}", file=log)
+        print(f"     Bullets: {len(summary.get('bullets', []))}", file=log)
+        print(f"     Highlights: {len(summary.get('highlights', []))}", file=log)
     except Exception as e:
-        print(f"  ❌ Summary generation failed: {e}")
+        print(f"  ❌ Summary generation failed: {e}", file=log)
         return False
     
     return True
 
 
-def test_web_renderer():
+def test_web_renderer(buf: Optional[TextIO] = None):
     """Test web view generation."""
-    print("\nTesting web renderer...")
+    log = buf if buf is not None else sys.stdout
+    print("\nTesting web renderer...", file=log)
     
-    from render.web_renderer import WebRenderer
+    WebRenderer = _feature_class('WebRenderer')
     
-    # Load config
-    with open('config.yaml', 'r') as f:
-        config = yaml.safe_load(f)
+    config = load_config()
     
     renderer = WebRenderer(config)
     
@@ -189,23 +224,61 @@ def test_web_renderer():
     }
     
     try:
-        html = renderer.render(
-            top_picks=test_papers,
-            buckets=buckets,
-            also_noteworthy=[],
-            digest_summary=digest_summary,
-            metadata={'total_papers': 1}
-        )
+        # Stream straight into the output file rather than building the page in memory
+        output_path = renderer.output_path
+        with open(output_path, 'w', encoding='utf-8') as f:
+            renderer.render(
+                top_picks=test_papers,
+                buckets=buckets,
+                also_noteworthy=[],
+                digest_summary=digest_summary,
+                metadata={'total_papers': 1},
+                out=f
+            )
         
-        # Save test output
-        output_path = renderer.save(html)
-        print(f"  ✅ Web view generated: {output_path}")
-        print(f"     Size: {len(html)} bytes")
+        print(f"  ✅ Web view generated: {output_path}", file=log)
+        print(f"     Size: {output_path.stat().st_size} bytes", file=log)
         
     except Exception as e:
-        print(f"  ❌ Web rendering failed: {e}")
+        print(f"  ❌ Web rendering failed: {e}", file=log)
+        return False
+    
+    return True
+
+
+def test_todays_filter(buf: Optional[TextIO] = None):
+    """Test the today's-papers filter on papers shaped like each fetcher's output."""
+    log = buf if buf is not None else sys.stdout
+    print("\nTesting today's papers filter...", file=log)
+    
+    from main import DigestOrchestrator
+    
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(days=3)
+    papers = [
+        # RSS: published is a datetime
+        {'arxiv_id': 'rss-today', 'title': 'RSS today', 'published': now},
+        {'arxiv_id': 'rss-old', 'title': 'RSS old', 'published': old},
+        # PubMed: ISO string, or None when the date could not be parsed
+        {'arxiv_id': 'pubmed-today', 'title': 'PubMed today', 'published': now.isoformat()},
+        {'arxiv_id': 'pubmed-undated', 'title': 'PubMed undated', 'published': None},
+        # bioRxiv: ISO string of a midnight datetime, or None
+        {'arxiv_id': 'biorxiv-old', 'title': 'bioRxiv old', 'published': old.replace(hour=0, minute=0).isoformat()},
+        {'arxiv_id': 'biorxiv-undated', 'title': 'bioRxiv undated', 'published': None},
+    ]
+    expected = ['rss-today', 'pubmed-today', 'pubmed-undated', 'biorxiv-undated']
+    
+    try:
+        kept = [p['arxiv_id'] for p in DigestOrchestrator._filter_todays_papers(papers)]
+    except Exception as e:
+        print(f"  ❌ Filter raised: {e!r}", file=log)
+        return False
+    
+    if kept != expected:
+        print(f"  ❌ Kept {kept}, expected {expected}", file=log)
         return False
     
+    print(f"  ✅ Kept today's and undated papers, dropped {len(papers) - len(kept)} old ones", file=log)
     return True
 
 
@@ -226,14 +299,37 @@ def main():
     resend_key = os.getenv('RESEND_API_KEY')
     print(f"  RESEND_API_KEY: {'✅ Set' if resend_key else '⚠️  Not set'}")
     
-    # Run tests
-    results = []
-    
-    results.append(("Imports", test_imports()))
-    results.append(("Figure Extraction", test_figure_extraction()))
-    results.append(("X Finder", test_x_finder()))
-    results.append(("Digest Summary", test_digest_summary()))
-    results.append(("Web Renderer", test_web_renderer()))
+    run_network = os.getenv('RUN_NETWORK_TESTS')
+    print(f"  RUN_NETWORK_TESTS: {'✅ Set' if run_network else '⚠️  Not set (arXiv/X lookups skipped)'}")
+    
+    # Run tests. Imports run first on the main thread so the others find the
+    # modules already loaded; the rest are independent and mostly wait on the
+    # network, so they run concurrently.
+    results = [("Imports", test_imports())]
+    
+    # Create the shared config and session up front so concurrent tests
+    # don't each build their own
+    load_config()
+    _get_session()
+    
+    tests = [
+        ("Figure Extraction", test_figure_extraction),
+        ("X Finder", test_x_finder),
+        ("Digest Summary", test_digest_summary),
+        ("Web Renderer", test_web_renderer),
+        ("Today Filter", test_todays_filter),
+    ]
+    # Each test writes to its own buffer, printed in order once all are done,
+    # so concurrent output doesn't interleave
+    buffers = {name: StringIO() for name, _ in tests}
+    with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+        futures = {executor.submit(test, buffers[name]): name for name, test in tests}
+        outcomes = {futures[future]: future.result() for future in as_completed(futures)}
+    
+    # Report in the original order
+    for name, _ in tests:
+        sys.stdout.write(buffers[name].getvalue())
+    results.extend((name, outcomes[name]) for name, _ in tests)
     
     # Summary
     print("\n" + "=" * 60)
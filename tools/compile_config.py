@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Compile config.yaml into config_compiled.py, a Python literal that imports
+from cached bytecode instead of being parsed as YAML on every test run.
+
+Usage: python tools/compile_config.py [config.yaml] [config_compiled.py]
+"""
+
+import ast
+import os
+import pprint
+import sys
+
+import yaml
+
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def compile_config(config_path: str = 'config.yaml', output_path: str = 'config_compiled.py'):
+    """Write the parsed config as CONFIG, stamped with the source file's mtime."""
+    with open(config_path, 'rb') as f:
+        config = yaml.load(f, Loader=YAML_LOADER)
+
+    literal = pprint.pformat(config, sort_dicts=False)
+    # Only plain YAML scalars survive as literals (no dates or custom tags)
+    if ast.literal_eval(literal) != config:
+        raise ValueError(f"{config_path} has values that cannot be written as a Python literal")
+
+    source_mtime_ns = os.stat(config_path).st_mtime_ns
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(f"# Generated from {os.path.basename(config_path)} by tools/compile_config.py; do not edit.\n")
+        f.write(f"SOURCE_MTIME_NS = {source_mtime_ns}\n\n")
+        f.write(f"CONFIG = {literal}\n")
+
+
+if __name__ == '__main__':
+    compile_config(*sys.argv[1:3])
+    print("✅ Compiled config.yaml")